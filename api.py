@@ -1,45 +1,97 @@
+import asyncio
+import json
+import os
 import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
-from fastapi import FastAPI, Request, Depends, HTTPException, Security
+import anyio
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Security
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import APIKeyHeader
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, Field
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 
+from src.admission import AdmissionController, Overloaded
+from src.batcher import MicroBatcher
 from src.classifier import TextClassifier
-from src.config import API_HOST, API_PORT, RATE_LIMIT, CONFIDENCE_THRESHOLD, REVIEW_THRESHOLD, API_KEY
-from src.database import PredictionDB
+from src.config import (
+    API_HOST,
+    API_KEY,
+    API_PORT,
+    API_WORKERS,
+    MODEL_WATCH_INTERVAL,
+    PROFILE_MAX_SECONDS,
+    SHADOW_MODEL,
+    STREAM_CHUNK_SIZE,
+    STREAM_MAX_LINE_BYTES,
+    STREAM_MAX_WAIT,
+)
+from src.database import GRANULARITIES, PredictionDB
+from src.executor import inference_executor, run_inference
 from src.logger import get_logger
-from src.metrics import PREDICTION_COUNT, PREDICTION_LATENCY, FEEDBACK_COUNT
+from src.metrics import FEEDBACK_COUNT, PREDICTION_COUNT, PREDICTION_LATENCY
+from src.profiler import sample_profile
+from src.ratelimit import RateLimited, RateLimiter
+from src.registry import ModelRegistry, ModelWatcher
+from src.shadow import ShadowRouter
+from src.tracing import endpoint, span, traced
 
 APP_VERSION = "1.1.0"
 _start_time = time.time()
 
 log = get_logger("api")
 
-limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="Text Moderation API")
-app.state.limiter = limiter
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if watcher is not None:
+        watcher.stop()
+    router.close()
+    db.close()
+
+
+app = FastAPI(title="Text Moderation API", lifespan=lifespan)
+limiter = RateLimiter()
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-def verify_api_key(key: str = Security(api_key_header)):
+async def verify_api_key(key: str = Security(api_key_header)):
     if not API_KEY:
         return
     if key != API_KEY:
         raise HTTPException(status_code=403, detail="Invalid API key")
 
 
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    return JSONResponse(status_code=429, content={"error": "Too many requests"})
+async def rate_limit(request: Request, key: str = Security(api_key_header)):
+    ip = request.client.host if request.client else "unknown"
+    # SQLite and Redis stores do I/O (busy_timeout, network) that must not stall the loop
+    if getattr(limiter.store, "blocking", True):
+        await run_in_threadpool(limiter.check, ip, key)
+    else:
+        limiter.check(ip, key)
+
+
+@app.exception_handler(RateLimited)
+async def rate_limit_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"error": "Too many requests"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server overloaded"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 app.add_middleware(
@@ -51,6 +103,28 @@ app.add_middleware(
 
 clf = TextClassifier()
 db = PredictionDB()
+registry = ModelRegistry()
+router = ShadowRouter(clf, db)
+
+
+def _predict_batch(texts: list[str]) -> list[dict]:
+    # Batches mix many /predict requests, so their model stages are labelled by endpoint only
+    with endpoint("predict"):
+        return router.get_detail_batch(texts)
+
+
+batcher = MicroBatcher(_predict_batch, executor=inference_executor)
+admission = AdmissionController()
+watcher = ModelWatcher(clf).start() if MODEL_WATCH_INTERVAL > 0 else None
+
+
+def _candidate_path(model: str) -> str:
+    # A registry version ("20250101_120000", "latest") or a path to a model file
+    return model if os.path.isfile(model) else registry.path(model)
+
+
+if SHADOW_MODEL:
+    router.set_candidate(_candidate_path(SHADOW_MODEL))
 
 log.info(f"API ready on {API_HOST}:{API_PORT}")
 
@@ -63,7 +137,14 @@ class BatchRequest(BaseModel):
     texts: list[str] = Field(min_length=1, max_length=100)
 
 
+class ExplainBatchRequest(BaseModel):
+    texts: list[str] = Field(min_length=1, max_length=1000)
+    top_n: int = Field(10, ge=1, le=100)
+
+
 VALID_LABELS = {"product", "adult", "toxic"}
+MAX_TEXT_LENGTH = 5000
+MAX_TIMESERIES_BUCKETS = 10000
 
 
 class FeedbackRequest(BaseModel):
@@ -71,12 +152,45 @@ class FeedbackRequest(BaseModel):
     correct_label: str = Field(min_length=1)
 
 
+class ShadowRequest(BaseModel):
+    version: str = Field(min_length=1)
+    sample_rate: float | None = Field(None, ge=0, le=1)
+    canary_percent: float | None = Field(None, ge=0, le=100)
+
+
+def _save_predictions(entries: list[dict], block: bool = True) -> None:
+    db.save_many(
+        (
+            (e["text"], e["label"], e["confidence"], e["allowed"], e["model_version"])
+            for e in entries
+        ),
+        block,
+    )
+
+
+async def _save_predictions_async(entries: list[dict], block: bool = False) -> None:
+    # With write-behind, single requests only enqueue on the event loop, dropping rather
+    # than waiting when the queue is full (counted in db_writes_dropped_total). Streams pass
+    # block=True and wait for queue space in the threadpool, which throttles the upload
+    # instead of losing rows; synchronous writes also go to the threadpool
+    with span("db_save"):
+        if db.write_behind and not block:
+            _save_predictions(entries, block=False)
+        else:
+            await run_in_threadpool(_save_predictions, entries)
+
+
+def _respond(content) -> JSONResponse:
+    with span("serialize"):
+        return JSONResponse(content)
+
+
 @app.get("/health")
-def health():
+async def health():
     uptime = time.time() - _start_time
     db_ok = True
     try:
-        db.conn.execute("SELECT 1")
+        await run_in_threadpool(db.ping)
     except Exception:
         db_ok = False
 
@@ -84,86 +198,432 @@ def health():
         "status": "ok",
         "version": APP_VERSION,
         "uptime_seconds": round(uptime, 1),
-        "model_loaded": clf._model is not None,
+        "model_loaded": clf._estimator is not None,
+        "model_version": clf.version,
         "database_connected": db_ok,
     }
 
 
-@app.post("/predict")
-@limiter.limit(RATE_LIMIT)
-def predict(request: Request, req: TextRequest, _=Depends(verify_api_key)):
-    start = time.perf_counter()
-    detail = clf.get_detail(req.text)
-    PREDICTION_LATENCY.observe(time.perf_counter() - start)
-    PREDICTION_COUNT.labels(label=detail["label"], allowed=str(detail["allowed"])).inc()
-    db.save(detail["text"], detail["label"], detail["confidence"], detail["allowed"])
-    log.info(f"{detail['label']} ({detail['confidence']}) {'ALLOW' if detail['allowed'] else 'BLOCK'}")
-    return detail
-
-
-@app.post("/predict/batch")
-@limiter.limit(RATE_LIMIT)
-def predict_batch(request: Request, req: BatchRequest, _=Depends(verify_api_key)):
-    start = time.perf_counter()
-    results = clf.predict_batch(req.texts)
-    PREDICTION_LATENCY.observe(time.perf_counter() - start)
-    response = []
-    for text, (label, conf) in zip(req.texts, results):
-        allowed = label == "product" and conf >= CONFIDENCE_THRESHOLD
-        PREDICTION_COUNT.labels(label=label, allowed=str(allowed)).inc()
-        entry = {
-            "text": text[:100],
-            "label": label,
-            "confidence": round(conf, 4),
-            "allowed": allowed,
-            "needs_review": conf < REVIEW_THRESHOLD,
-        }
-        db.save(entry["text"], label, round(conf, 4), allowed)
-        response.append(entry)
-    log.info(f"Batch: {len(req.texts)} texts")
-    return response
-
-
-@app.post("/predict/explain")
-@limiter.limit(RATE_LIMIT)
-def explain(request: Request, req: TextRequest, _=Depends(verify_api_key)):
-    result = clf.explain(req.text)
-    log.info(f"Explain: {result['label']} ({result['confidence']})")
-    return result
-
-
-@app.post("/feedback")
-@limiter.limit(RATE_LIMIT)
-def feedback(request: Request, req: FeedbackRequest, _=Depends(verify_api_key)):
+@app.post("/predict", dependencies=[Depends(rate_limit)])
+async def predict(req: TextRequest, _=Depends(verify_api_key)):
+    with traced("predict"):
+        start = time.perf_counter()
+        async with admission.slot("high"):
+            with span("inference"):
+                detail = await batcher.submit(req.text)
+        PREDICTION_LATENCY.observe(time.perf_counter() - start)
+        PREDICTION_COUNT.labels(label=detail["label"], allowed=str(detail["allowed"])).inc()
+        await _save_predictions_async([detail])
+        with span("log"):
+            status = "ALLOW" if detail["allowed"] else "BLOCK"
+            log.info(f"{detail['label']} ({detail['confidence']}) {status}")
+        return _respond(detail)
+
+
+@app.post("/predict/batch", dependencies=[Depends(rate_limit)])
+async def predict_batch(req: BatchRequest, _=Depends(verify_api_key)):
+    with traced("predict_batch"):
+        start = time.perf_counter()
+        async with admission.slot("normal"):
+            with span("inference"):
+                response = await run_inference(router.get_detail_batch, req.texts)
+        PREDICTION_LATENCY.observe(time.perf_counter() - start)
+        for entry in response:
+            PREDICTION_COUNT.labels(label=entry["label"], allowed=str(entry["allowed"])).inc()
+        await _save_predictions_async(response)
+        with span("log"):
+            log.info(f"Batch: {len(req.texts)} texts")
+        return _respond(response)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    # The body iterator reads the request body while the response streams, so Starlette's
+    # disconnect listener must not consume receive() concurrently; a disconnect surfaces
+    # as ClientDisconnect from request.stream() instead
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class DuplexRequest(Request):
+    # Request.is_disconnected() drops a body chunk it happens to receive, which would lose
+    # upload data while the stream is still being read; here that chunk is handed back to
+    # stream() first, so disconnects can be checked mid-upload
+    def __init__(self, request: Request):
+        super().__init__(request.scope, self._replay)
+        self._upstream = request.receive
+        self._pending = None
+
+    async def _replay(self):
+        if self._pending is not None:
+            message, self._pending = self._pending, None
+            return message
+        return await self._upstream()
+
+    async def is_disconnected(self) -> bool:
+        if not self._is_disconnected and self._pending is None:
+            # Like Starlette: only looks at a message that is already available
+            with anyio.CancelScope() as scope:
+                scope.cancel()
+                self._pending = await self._upstream()
+            if self._pending and self._pending.get("type") == "http.disconnect":
+                self._is_disconnected = True
+        return self._is_disconnected
+
+
+async def _stream_lines(request: Request):
+    # Yields (line_number, bytes); a line longer than STREAM_MAX_LINE_BYTES yields None
+    # and is skipped up to the next newline, so memory stays bounded for any upload
+    buffer, number, skipping = b"", 0, False
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, None if skipping else line
+            skipping = False
+        if len(buffer) > STREAM_MAX_LINE_BYTES:
+            buffer, skipping = b"", True
+    if buffer or skipping:
+        yield number + 1, None if skipping else buffer
+
+
+def _parse_line(line: bytes | None, ndjson: bool) -> dict:
+    if line is None:
+        raise ValueError("Line too long")
+    if not ndjson:
+        item = {"text": line.decode("utf-8")}
+    else:
+        item = json.loads(line)
+        if isinstance(item, str):
+            item = {"text": item}
+    if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+        raise ValueError("Expected a JSON string or an object with a 'text' field")
+    if not 1 <= len(item["text"]) <= MAX_TEXT_LENGTH:
+        raise ValueError(f"'text' must be 1-{MAX_TEXT_LENGTH} characters")
+    return item
+
+
+async def _stream_inference(request: Request, texts: list[str]) -> list[dict]:
+    # Stream chunks are the lowest priority. Headers are already sent, so an overloaded
+    # chunk cannot get a 503: it backs off and retries, which stops reading the upload
+    # and throttles the client instead of failing the stream halfway. After
+    # STREAM_MAX_WAIT, or once the client has gone, Overloaded ends the stream
+    delay = max(admission.queue_timeout, 0.01)
+    deadline = time.monotonic() + STREAM_MAX_WAIT
+    while True:
+        try:
+            async with admission.slot("low"):
+                return await run_inference(clf.get_detail_batch, texts)
+        except Overloaded as e:
+            if time.monotonic() + delay > deadline or await request.is_disconnected():
+                raise
+            await asyncio.sleep(delay)
+            delay = max(min(delay * 2, e.retry_after), 0.01)
+
+
+async def _moderate_chunk(request: Request, items: list[dict]) -> str:
+    with traced("predict_stream"):
+        valid = [item for item in items if "error" not in item]
+        with span("inference"):
+            details = await _stream_inference(request, [item["text"] for item in valid])
+        for item, detail in zip(valid, details):
+            PREDICTION_COUNT.labels(label=detail["label"], allowed=str(detail["allowed"])).inc()
+            item.update(detail)
+        await _save_predictions_async(details, block=True)
+        with span("serialize"):
+            return "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+
+
+async def _moderate_stream(request: Request, ndjson: bool):
+    chunk, total = [], 0
+    try:
+        async for number, line in _stream_lines(request):
+            if line is not None and not line.strip():
+                continue
+            try:
+                item = _parse_line(line, ndjson)
+                result = {"line": number, "text": item["text"]}
+                if "id" in item:
+                    result["id"] = item["id"]
+            except (ValueError, UnicodeDecodeError) as e:
+                result = {"line": number, "error": str(e)}
+            chunk.append(result)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield await _moderate_chunk(request, chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            yield await _moderate_chunk(request, chunk)
+            total += len(chunk)
+    except Overloaded as e:
+        log.warning(f"Stream: overloaded after {total} lines")
+        yield json.dumps({"error": "Server overloaded", "retry_after": e.retry_after}) + "\n"
+        return
+    log.info(f"Stream: {total} lines")
+
+
+@app.post("/predict/stream", dependencies=[Depends(rate_limit)])
+async def predict_stream(request: Request, _=Depends(verify_api_key)):
+    # NDJSON in (one JSON string or {"text": ..., "id": ...} per line, or plain text lines
+    # with Content-Type: text/plain), NDJSON out in STREAM_CHUNK_SIZE chunks
+    ndjson = not request.headers.get("content-type", "").startswith("text/plain")
+    return DuplexStreamingResponse(
+        _moderate_stream(DuplexRequest(request), ndjson), media_type="application/x-ndjson"
+    )
+
+
+@app.post("/predict/explain", dependencies=[Depends(rate_limit)])
+async def explain(req: TextRequest, _=Depends(verify_api_key)):
+    with traced("explain"):
+        async with admission.slot("low"):
+            with span("inference"):
+                result = await run_inference(clf.explain, req.text)
+        with span("log"):
+            log.info(f"Explain: {result['label']} ({result['confidence']})")
+        return _respond(result)
+
+
+@app.post("/predict/explain/batch", dependencies=[Depends(rate_limit)])
+async def explain_batch(req: ExplainBatchRequest, _=Depends(verify_api_key)):
+    with traced("explain_batch"):
+        async with admission.slot("low"):
+            with span("inference"):
+                results = await run_inference(clf.explain_batch, req.texts, req.top_n)
+        with span("log"):
+            log.info(f"Explain batch: {len(req.texts)} texts")
+        return _respond(results)
+
+
+@app.post("/feedback", dependencies=[Depends(rate_limit)])
+async def feedback(req: FeedbackRequest, _=Depends(verify_api_key)):
     if req.correct_label not in VALID_LABELS:
-        raise HTTPException(status_code=400, detail=f"Invalid label. Must be one of: {', '.join(sorted(VALID_LABELS))}")
-    predicted = clf.predict(req.text)[0]
-    db.save_feedback(req.text, predicted, req.correct_label)
-    FEEDBACK_COUNT.labels(predicted_label=predicted, correct_label=req.correct_label).inc()
-    log.info(f"Feedback: predicted={predicted}, correct={req.correct_label}")
-    return {"text": req.text[:100], "predicted_label": predicted, "correct_label": req.correct_label}
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid label. Must be one of: {', '.join(sorted(VALID_LABELS))}",
+        )
+    with traced("feedback"):
+        async with admission.slot("normal"):
+            with span("inference"):
+                detail = await run_inference(clf.get_detail, req.text)
+        predicted = detail["label"]
+        with span("db_save"):
+            if db.write_behind:
+                db.save_feedback(
+                    req.text, predicted, req.correct_label, detail["model_version"], block=False
+                )
+            else:
+                await run_in_threadpool(
+                    db.save_feedback,
+                    req.text,
+                    predicted,
+                    req.correct_label,
+                    detail["model_version"],
+                )
+        FEEDBACK_COUNT.labels(predicted_label=predicted, correct_label=req.correct_label).inc()
+        with span("log"):
+            log.info(f"Feedback: predicted={predicted}, correct={req.correct_label}")
+        return _respond(
+            {
+                "text": req.text[:100],
+                "predicted_label": predicted,
+                "correct_label": req.correct_label,
+            }
+        )
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def _set_next_cursor(response: Response, rows: list, limit: int) -> None:
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+
+
+async def feedback_filters(
+    predicted_label: str | None = None,
+    correct_label: str | None = None,
+    since: datetime | None = Query(None, alias="from"),
+    until: datetime | None = Query(None, alias="to"),
+):
+    return {
+        "predicted_label": predicted_label,
+        "correct_label": correct_label,
+        "since": since,
+        "until": until,
+    }
 
 
 @app.get("/feedback/list")
-def feedback_list(limit: int = 50, _=Depends(verify_api_key)):
-    return db.get_feedback(min(limit, 200))
+async def feedback_list(
+    response: Response,
+    limit: int = Query(50, ge=1),
+    cursor: int | None = None,
+    filters: dict = Depends(feedback_filters),
+    _=Depends(verify_api_key),
+):
+    limit = min(limit, 200)
+    rows = await run_in_threadpool(db.get_feedback, limit, before_id=cursor, **filters)
+    _set_next_cursor(response, rows, limit)
+    return rows
+
+
+@app.get("/feedback/export")
+async def feedback_export(filters: dict = Depends(feedback_filters), _=Depends(verify_api_key)):
+    return StreamingResponse(
+        _ndjson(db.iter_feedback(**filters)), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/admin/models")
+async def list_models(_=Depends(verify_api_key)):
+    return {"current": clf.version, "versions": await run_in_threadpool(registry.list_versions)}
+
+
+@app.post("/admin/models/{version}/load")
+async def load_model(version: str, _=Depends(verify_api_key)):
+    # Switches this worker process only; with API_WORKERS > 1 promote through the
+    # watched classifier.pkl instead (see README, "Model versions and hot reload")
+    try:
+        path = registry.path(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    try:
+        loaded = await run_in_threadpool(clf.load, path)
+    except Exception as e:
+        log.error(f"Loading model {version} failed: {e}")
+        raise HTTPException(status_code=500, detail="Model load failed, current model kept")
+    log.info(f"Switched to model version {loaded}")
+    return {"current": loaded}
+
+
+@app.get("/admin/shadow")
+async def shadow_status(_=Depends(verify_api_key)):
+    status = router.status()
+    status["results"] = await run_in_threadpool(db.get_shadow_summary, status["candidate_version"])
+    return status
+
+
+@app.post("/admin/shadow")
+async def shadow_start(req: ShadowRequest, _=Depends(verify_api_key)):
+    try:
+        path = _candidate_path(req.version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {req.version}")
+    try:
+        await run_in_threadpool(router.set_candidate, path, req.sample_rate, req.canary_percent)
+    except Exception as e:
+        log.error(f"Loading candidate {req.version} failed: {e}")
+        raise HTTPException(status_code=500, detail="Candidate model load failed")
+    return router.status()
+
+
+@app.delete("/admin/shadow")
+async def shadow_stop(_=Depends(verify_api_key)):
+    router.clear_candidate()
+    return router.status()
+
+
+@app.get("/admin/profile")
+async def profile(
+    seconds: float = Query(5, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    format: str = "json",
+    _=Depends(verify_api_key),
+):
+    if seconds > PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400, detail=f"seconds must be at most {PROFILE_MAX_SECONDS:g}"
+        )
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'collapsed'")
+    try:
+        result = await run_in_threadpool(sample_profile, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return Response(content=result["collapsed"], media_type="text/plain")
+    return result
 
 
 @app.get("/metrics")
-def metrics():
+async def metrics():
     return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/stats")
-def stats(_=Depends(verify_api_key)):
-    return db.get_stats()
+async def stats(_=Depends(verify_api_key)):
+    return await run_in_threadpool(db.get_stats)
+
+
+@app.get("/stats/timeseries")
+async def stats_timeseries(
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    granularity: str = "hour",
+    _=Depends(verify_api_key),
+):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid granularity. Must be one of: {', '.join(GRANULARITIES)}",
+        )
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=1)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start) / GRANULARITIES[granularity][2] > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail="Time range too large for this granularity")
+    return await run_in_threadpool(db.get_timeseries, start, end, granularity)
+
+
+async def history_filters(
+    label: str | None = None,
+    allowed: bool | None = None,
+    min_confidence: float | None = None,
+    max_confidence: float | None = None,
+    since: datetime | None = Query(None, alias="from"),
+    until: datetime | None = Query(None, alias="to"),
+):
+    return {
+        "label": label,
+        "allowed": allowed,
+        "min_confidence": min_confidence,
+        "max_confidence": max_confidence,
+        "since": since,
+        "until": until,
+    }
 
 
 @app.get("/history")
-def history(limit: int = 20, _=Depends(verify_api_key)):
-    return db.get_recent(min(limit, 100))
+async def history(
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: int | None = None,
+    filters: dict = Depends(history_filters),
+    _=Depends(verify_api_key),
+):
+    limit = min(limit, 100)
+    rows = await run_in_threadpool(db.get_recent, limit, before_id=cursor, **filters)
+    _set_next_cursor(response, rows, limit)
+    return rows
+
+
+@app.get("/history/export")
+async def history_export(filters: dict = Depends(history_filters), _=Depends(verify_api_key)):
+    return StreamingResponse(_ndjson(db.iter_recent(**filters)), media_type="application/x-ndjson")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=API_HOST, port=int(API_PORT))
+
+    if API_WORKERS > 1:
+        # Each worker imports this module and memory-maps the same model file
+        uvicorn.run("api:app", host=API_HOST, port=int(API_PORT), workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host=API_HOST, port=int(API_PORT))
@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import ARCHIVE_DIR, RETENTION_CHUNK_SIZE, RETENTION_DAYS
+from src.database import PredictionDB
+from src.retention import archive_expired
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive and delete expired predictions")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--archive-dir", default=str(ARCHIVE_DIR))
+    parser.add_argument("--chunk-size", type=int, default=RETENTION_CHUNK_SIZE)
+    parser.add_argument(
+        "--pause",
+        type=float,
+        default=0.05,
+        help="Seconds to sleep between chunks so API writers are not starved",
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Run a full VACUUM to enable incremental vacuum on an old database",
+    )
+    args = parser.parse_args()
+
+    db = PredictionDB(write_behind=False)
+    if args.vacuum:
+        db.vacuum()
+    archive_expired(db, args.days, args.archive_dir, args.chunk_size, args.pause)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
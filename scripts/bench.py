@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# src is imported inside the benchmarks: src.config reads the environment once, and main()
+# must redirect it first, while importing this module for its helpers changes nothing
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+WORDS = {
+    "product": (
+        "Samsung Galaxy S24 Ultra 256GB Nike Air Max Running Shoes Apple MacBook Pro Arçelik "
+        "No Frost Buzdolabı Litre Sony Headphones Dyson Cordless Vacuum Philips Airfryer XXL "
+        "Sıcak Hava Fritözü CeraVe Moisturizing Cream IKEA Kitaplık Beyaz Lenovo Laptop inç"
+    ).split(),
+    "adult": (
+        "Vibrator Wand Massager Speed Rechargeable Dildo Realistic Silicone Suction Cup "
+        "Satisfyer Anal Plug Bondage Kit Restraint Vibratör Klitoral Kayganlaştırıcı Jel "
+        "Fantezi Kıyafet Kostüm Prezervatif Ultra İnce Lovense Bluetooth"
+    ).split(),
+    "toxic": (
+        "siktir git buradan aptal herif you are a piece of shit go fuck yourself moron "
+        "hırsız piç kurusu kill yourself nobody will miss you sen gerçekten mal mısın "
+        "I will find you and kill your family"
+    ).split(),
+}
+# Short titles, listing names and full descriptions
+LENGTHS = ((3, 6, 0.5), (8, 20, 0.35), (40, 120, 0.15))
+
+
+def isolate_environment() -> str:
+    # Keep benchmark runs away from the real database and rate limits
+    tmp_dir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["DB_PATH"] = os.path.join(tmp_dir, "predictions.db")
+    os.environ["RATE_LIMIT_PATH"] = os.path.join(tmp_dir, "ratelimit.db")
+    os.environ["RATE_LIMIT"] = os.environ["API_KEY_RATE_LIMIT"] = "1000000/second"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return tmp_dir
+
+
+def build_corpus(size: int, seed: int = 42) -> list[str]:
+    # Unique mixed-length texts: the test set when present, else synthetic listings
+    from scripts.train import load_data
+    from src.config import DATA_DIR
+
+    rng = random.Random(seed)
+    test_path = os.path.join(DATA_DIR, "test.txt")
+    base = load_data(test_path)[0] if os.path.isfile(test_path) else []
+    texts = []
+    while len(texts) < size:
+        if base and rng.random() < 0.5:
+            texts.append(f"{rng.choice(base)} {len(texts)}")
+            continue
+        low, high, _ = rng.choices(LENGTHS, weights=[w for *_, w in LENGTHS])[0]
+        words = WORDS[rng.choice(list(WORDS))]
+        texts.append(
+            " ".join(rng.choice(words) for _ in range(rng.randint(low, high))) + f" {len(texts)}"
+        )
+    return texts
+
+
+def summarize(durations: list[float], items_per_call: int = 1) -> dict:
+    ms = np.asarray(durations) * 1000
+    return {
+        "iterations": len(ms),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "items_per_sec": round(items_per_call * 1000 / float(ms.mean()), 1),
+    }
+
+
+def measure(fn, args_list: list, warmup: int = 10, items_per_call: int = 1) -> dict:
+    # Warm up, time every call, then replay a few calls under tracemalloc for peak memory
+    for args in args_list[:warmup]:
+        fn(*args)
+    durations = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        durations.append(time.perf_counter() - start)
+    result = summarize(durations, items_per_call)
+
+    tracemalloc.start()
+    for args in args_list[:5]:
+        fn(*args)
+    result["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    tracemalloc.stop()
+    return result
+
+
+def bench_model(clf, corpus: list[str], iterations: int) -> dict:
+    texts = [(t,) for t in corpus[:iterations]]
+    results = {
+        "clean": measure(clf._clean, texts),
+        "vectorize": measure(lambda t: clf._vectorizer.transform([t]), texts),
+        "predict": measure(clf.predict, texts),
+        "explain": measure(clf.explain, texts[: max(10, iterations // 5)]),
+    }
+    for size in (1, 10, 100, 1000):
+        calls = max(5, min(iterations, 20000 // size))
+        batches = [(corpus[i * size % len(corpus) :][:size],) for i in range(calls)]
+        results[f"predict_batch_{size}"] = measure(clf.predict_batch, batches, 3, size)
+    return results
+
+
+def bench_db(sizes: list[int], iterations: int, tmp_dir: str) -> dict:
+    from src.database import PredictionDB
+
+    results = {}
+    row = ("Samsung Galaxy S24 Ultra 256GB", "product", 0.97, True, "bench")
+    for size in sizes:
+        db = PredictionDB(os.path.join(tmp_dir, f"db_{size}.db"), write_behind=False)
+        for start in range(0, size, 10000):
+            db.save_many([row] * min(10000, size - start))
+        results[f"db_get_stats_{size}"] = measure(db.get_stats, [()] * iterations)
+        results[f"db_recent_{size}"] = measure(db.get_recent, [()] * iterations)
+        results[f"db_save_{size}"] = measure(db.save, [row] * iterations)
+        db.close()
+
+    db = PredictionDB(os.path.join(tmp_dir, "db_write_behind.db"), write_behind=True)
+    results["db_save_write_behind"] = measure(db.save, [row] * iterations)
+    db.close()
+    return results
+
+
+def bench_api(corpus: list[str], iterations: int, concurrency: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    from api import app
+
+    results = {}
+    with TestClient(app) as client:
+
+        def post(path, body):
+            response = client.post(path, json=body)
+            response.raise_for_status()
+
+        texts = corpus[:iterations]
+        results["api_predict"] = measure(post, [("/predict", {"text": t}) for t in texts])
+        batches = [
+            ("/predict/batch", {"texts": corpus[i : i + 100]})
+            for i in range(0, min(len(corpus), iterations * 10), 100)
+        ]
+        results["api_predict_batch_100"] = measure(post, batches, 3, 100)
+
+        # Throughput with concurrent clients through the micro-batcher
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(lambda t: post("/predict", {"text": t}), texts))
+        elapsed = time.perf_counter() - start
+        results[f"api_predict_concurrent_{concurrency}"] = {
+            "iterations": len(texts),
+            "items_per_sec": round(len(texts) / elapsed, 1),
+        }
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float, metric: str = "p95_ms") -> list[str]:
+    # A benchmark regresses when its latency grows (or throughput drops) beyond threshold
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        if metric in result and metric in base and base[metric] > 0:
+            change = result[metric] / base[metric] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{name}: {metric} {base[metric]} -> {result[metric]} (+{change:.0%})"
+                )
+        elif "p95_ms" not in result and base.get("items_per_sec"):
+            change = 1 - result["items_per_sec"] / base["items_per_sec"]
+            if change > threshold:
+                regressions.append(
+                    f"{name}: items_per_sec {base['items_per_sec']} -> "
+                    f"{result['items_per_sec']} (-{change:.0%})"
+                )
+    return regressions
+
+
+def run(
+    suites: list[str],
+    iterations: int,
+    corpus_size: int,
+    db_sizes: list[int],
+    concurrency: int,
+    tmp_dir: str,
+) -> dict:
+    from src.cache import PredictionCache
+    from src.classifier import TextClassifier
+
+    corpus = build_corpus(corpus_size)
+    # Cache off: every corpus text is unique and the benchmarks measure the model
+    clf = TextClassifier(cache=PredictionCache(max_size=0))
+    results = {}
+    if "model" in suites:
+        results.update(bench_model(clf, corpus, iterations))
+    if "db" in suites:
+        results.update(bench_db(db_sizes, iterations, tmp_dir))
+    if "api" in suites:
+        results.update(bench_api(corpus, iterations, concurrency))
+
+    lengths = [len(t) for t in corpus]
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model_version": clf.version,
+            "corpus": {
+                "size": len(corpus),
+                "mean_chars": round(float(np.mean(lengths)), 1),
+                "max_chars": max(lengths),
+            },
+        },
+        "results": results,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark model, database and API")
+    parser.add_argument("--suites", default="model,db,api", help="Comma list of model,db,api")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--db-sizes", default="1000,100000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Relative slowdown that counts as a regression"
+    )
+    args = parser.parse_args()
+
+    tmp_dir = isolate_environment()
+    report = run(
+        args.suites.split(","),
+        args.iterations,
+        args.corpus_size,
+        [int(s) for s in args.db_sizes.split(",")],
+        args.concurrency,
+        tmp_dir,
+    )
+
+    print(
+        f"{'BENCHMARK':<32} {'P50 MS':>10} {'P95 MS':>10} {'P99 MS':>10} {'ITEMS/S':>12} "
+        f"{'PEAK KB':>10}"
+    )
+    for name, r in report["results"].items():
+        print(
+            f"{name:<32} {r.get('p50_ms', '-'):>10} {r.get('p95_ms', '-'):>10} "
+            f"{r.get('p99_ms', '-'):>10} {r['items_per_sec']:>12} {r.get('peak_kb', '-'):>10}"
+        )
+    print(f"Max RSS: {report['max_rss_mb']} MB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline and os.path.isfile(args.baseline) and args.baseline != args.output:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
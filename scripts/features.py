@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import sklearn
+from scipy.sparse import csr_matrix
+
+from src.logger import get_logger
+
+log = get_logger("features")
+
+PARTS = ("data", "indices", "indptr")
+
+
+def cache_key(texts: list[str], params: dict) -> str:
+    # Same texts + same vectorizer settings (+ sklearn version) -> same matrix
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(sklearn.__version__.encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def load_features(path: str):
+    # The CSR parts are memory-mapped, so loading is instant and search workers that
+    # open the same files share one page-cache copy instead of pickling the matrix
+    if not os.path.isfile(os.path.join(path, "meta.json")):
+        return None
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    parts = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in PARTS]
+    X = csr_matrix(tuple(parts), shape=tuple(meta["shape"]), copy=False)
+    return joblib.load(os.path.join(path, "vectorizer.pkl")), X
+
+
+def save_features(path: str, vectorizer, X) -> None:
+    X = csr_matrix(X)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name in PARTS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(X, name))
+    joblib.dump(vectorizer, os.path.join(tmp_path, "vectorizer.pkl"))
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"shape": list(X.shape), "nnz": int(X.nnz)}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def vectorize_cached(texts: list[str], vectorizer, cache_dir: str | None):
+    # Returns the fitted vectorizer and the training matrix, fitting only on a cache miss
+    if cache_dir is None:
+        return vectorizer, vectorizer.fit_transform(texts)
+
+    path = os.path.join(cache_dir, cache_key(texts, vectorizer.get_params()))
+    cached = load_features(path)
+    if cached is not None:
+        log.info(f"Using cached features from {path}")
+        return cached
+
+    log.info("Vectorizing (feature cache miss)...")
+    X = vectorizer.fit_transform(texts)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_features(path, vectorizer, X)
+    log.info(f"Cached features in {path} ({X.shape[0]}x{X.shape[1]}, {X.nnz} nonzeros)")
+    return load_features(path)
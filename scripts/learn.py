@@ -0,0 +1,198 @@
+import argparse
+import copy
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+from sklearn.metrics import classification_report
+
+from scripts.train import MODEL_PATH, load_data, publish
+from src.classifier import TextClassifier, metadata_path, model_version
+from src.config import DATA_DIR
+from src.database import PredictionDB
+from src.logger import get_logger
+
+log = get_logger("learn")
+
+
+def load_metadata(model_path: str) -> dict:
+    path = metadata_path(model_path)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_watermark(model_path: str, meta: dict, watermark: int) -> None:
+    # Records progress without publishing an unchanged model: only the sidecars move, so
+    # the watcher (which watches the pickle) does not reload
+    paths = [metadata_path(model_path)]
+    versioned = os.path.join(os.path.dirname(model_path), f"classifier_{meta.get('version')}.json")
+    if meta.get("version") and os.path.isfile(versioned):
+        paths.append(versioned)
+    for path in paths:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**meta, "feedback_watermark": watermark}, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def feedback_batches(db: PredictionDB, after_id: int, batch_size: int):
+    # Oldest first from the watermark, so the watermark only ever moves forward
+    batch = []
+    for row in db.iter_feedback(chunk_size=batch_size, after_id=after_id):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def update(
+    pipeline, db: PredictionDB, after_id: int, batch_size: int = 1000, epochs: int = 1
+) -> tuple[int, int, int]:
+    # The vectorizer stays fixed, only the linear model moves
+    features, classifier = pipeline[:-1], pipeline[-1]
+    # partial_fit rejects class_weight="balanced", so feedback rows are weighted equally;
+    # the original setting is restored for the published model and later full retrains
+    class_weight = classifier.class_weight
+    classifier.set_params(class_weight=None)
+    classes = classifier.classes_
+    known = {str(c) for c in classes}
+
+    applied, skipped, watermark = 0, 0, after_id
+    try:
+        for batch in feedback_batches(db, after_id, batch_size):
+            watermark = batch[-1]["id"]
+            rows = [row for row in batch if row["correct_label"] in known]
+            skipped += len(batch) - len(rows)
+            if not rows:
+                continue
+            X = features.transform([TextClassifier._clean(row["text"]) for row in rows])
+            y = [row["correct_label"] for row in rows]
+            for _ in range(epochs):
+                classifier.partial_fit(X, y, classes=classes)
+            applied += len(rows)
+    finally:
+        classifier.set_params(class_weight=class_weight)
+    return applied, skipped, watermark
+
+
+def learn(
+    db: PredictionDB,
+    model_path: str | None = None,
+    test_path: str | None = None,
+    after_id: int | None = None,
+    batch_size: int = 1000,
+    epochs: int = 1,
+    max_drop: float = 0.01,
+    dry_run: bool = False,
+) -> dict:
+    model_path = model_path or MODEL_PATH
+    test_path = test_path or os.path.join(DATA_DIR, "test.txt")
+    if not os.path.isfile(test_path):
+        raise FileNotFoundError(f"Validation data not found: {test_path}")
+
+    meta = load_metadata(model_path)
+    if after_id is None:
+        after_id = meta.get("feedback_watermark", 0)
+
+    baseline = joblib.load(model_path)
+    candidate = copy.deepcopy(baseline)
+    applied, skipped, watermark = update(candidate, db, after_id, batch_size, epochs)
+    result = {
+        "base_version": model_version(model_path),
+        "after_id": after_id,
+        "watermark": watermark,
+        "applied": applied,
+        "skipped": skipped,
+        "published": None,
+        "rejected": False,
+    }
+    if skipped:
+        log.warning(f"Skipped {skipped} feedback rows with labels the model does not know")
+    if not applied:
+        log.info(f"No new feedback after id {after_id}")
+        if watermark > after_id and not dry_run:
+            # Every row was skipped; move past them so the next run does not reread them
+            save_watermark(model_path, meta, watermark)
+        return result
+
+    # Validation gate: the update may not cost more than max_drop macro F1 on the test set
+    X_test, y_test = load_data(test_path)
+    before = classification_report(
+        y_test, baseline.predict(X_test), output_dict=True, zero_division=0
+    )
+    after = classification_report(
+        y_test, candidate.predict(X_test), output_dict=True, zero_division=0
+    )
+    result["macro_f1_before"] = round(before["macro avg"]["f1-score"], 4)
+    result["macro_f1_after"] = round(after["macro avg"]["f1-score"], 4)
+    log.info(
+        f"Applied {applied} feedback rows (ids {after_id + 1}..{watermark}), macro F1 "
+        f"{result['macro_f1_before']} -> {result['macro_f1_after']}"
+    )
+
+    if result["macro_f1_after"] < result["macro_f1_before"] - max_drop:
+        log.warning(f"Update rejected: macro F1 dropped more than {max_drop}")
+        result["rejected"] = True
+        return result
+    if dry_run:
+        return result
+
+    result["published"] = publish(
+        candidate,
+        {
+            "train_samples": meta.get("train_samples"),
+            "base_version": result["base_version"],
+            "feedback_watermark": watermark,
+            "feedback_samples": meta.get("feedback_samples", 0) + applied,
+            "metrics": after,
+        },
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Apply new feedback to the current model with partial_fit and publish it"
+    )
+    parser.add_argument(
+        "--after-id",
+        type=int,
+        default=None,
+        help="Start after this feedback id instead of the model's watermark",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--epochs", type=int, default=1, help="partial_fit passes per batch")
+    parser.add_argument(
+        "--max-drop",
+        type=float,
+        default=0.01,
+        help="Largest allowed macro F1 drop on data/test.txt",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Validate but do not publish")
+    args = parser.parse_args()
+
+    db = PredictionDB(write_behind=False)
+    try:
+        result = learn(
+            db,
+            after_id=args.after_id,
+            batch_size=args.batch_size,
+            epochs=args.epochs,
+            max_drop=args.max_drop,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["rejected"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.train import MODEL_PATH, parse_labeled_line
+from src.cache import PredictionCache
+from src.classifier import TextClassifier
+from src.logger import get_logger
+
+log = get_logger("score")
+
+FORMATS = ("fasttext", "text", "csv", "ndjson")
+
+_clf = None
+
+
+class _Lines:
+    # Line iterator over a binary file that tracks the byte offset and line number,
+    # so a checkpoint can seek straight back to the first unconsumed line
+    def __init__(self, f, number: int = 0):
+        self.f = f
+        self.offset = f.tell()
+        self.number = number
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        self.number += 1
+        return line.decode("utf-8")
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    with open(path, "r", encoding="utf-8") as f:
+        return "fasttext" if f.readline().startswith("__label__") else "text"
+
+
+def read_records(
+    lines: _Lines,
+    fmt: str,
+    header: list[str] | None = None,
+    text_field: str = "text",
+    id_field: str = "id",
+):
+    # Yields (line_number, text, extra) where extra is copied into the output row
+    if fmt == "csv":
+        reader = csv.DictReader(lines, fieldnames=header)
+        while True:
+            number = lines.number + 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            if row.get(text_field):
+                yield number, row[text_field], {"id": row[id_field]} if id_field in row else {}
+
+    for line in lines:
+        if fmt == "fasttext":
+            parsed = parse_labeled_line(line)
+            if parsed:
+                yield lines.number, parsed[1], {"expected": parsed[0]}
+        elif fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                log.warning(f"Line {lines.number}: invalid JSON, skipped")
+                continue
+            if isinstance(item, str):
+                item = {text_field: item}
+            if isinstance(item, dict) and item.get(text_field):
+                extra = {"id": item[id_field]} if id_field in item else {}
+                yield lines.number, item[text_field], extra
+        elif line.strip():
+            yield lines.number, line.rstrip("\r\n"), {}
+
+
+def _chunks(records, lines: _Lines, chunk_size: int):
+    # Yields (chunk, (line_number, input_offset)) with the position right after the chunk
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk, (lines.number, lines.offset)
+            chunk = []
+    if chunk:
+        yield chunk, (lines.number, lines.offset)
+
+
+def _init_worker(model_path: str) -> None:
+    # Each worker maps the same model file read-only; the cache is useless for one-pass jobs
+    global _clf
+    _clf = TextClassifier(model_path, cache=PredictionCache(max_size=0))
+
+
+def _score_chunk(chunk: list) -> bytes:
+    details = _clf.get_detail_batch([text for _, text, _ in chunk])
+    return "".join(
+        json.dumps({"line": number, **extra, **detail}, ensure_ascii=False) + "\n"
+        for (number, _, extra), detail in zip(chunk, details)
+    ).encode("utf-8")
+
+
+def _save_checkpoint(path: str, state: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    fmt: str = "auto",
+    chunk_size: int = 1000,
+    workers: int | None = None,
+    checkpoint: str | None = None,
+    model_path: str = MODEL_PATH,
+    text_field: str = "text",
+    id_field: str = "id",
+) -> int:
+    fmt = detect_format(input_path) if fmt == "auto" else fmt
+    workers = workers or os.cpu_count() or 1
+    checkpoint = checkpoint or f"{output_path}.ckpt"
+
+    state = {
+        "input": os.path.abspath(input_path),
+        "lines": 0,
+        "input_offset": 0,
+        "output_offset": 0,
+        "header": None,
+    }
+    if os.path.isfile(checkpoint):
+        with open(checkpoint, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["input"] != state["input"]:
+            raise ValueError(f"Checkpoint {checkpoint} belongs to {saved['input']}")
+        state = saved
+        log.info(f"Resuming from line {state['lines']}")
+
+    start, scored = time.perf_counter(), 0
+    with open(input_path, "rb") as src, open(output_path, "r+b" if state["lines"] else "wb") as out:
+        # Drop output written after the last checkpoint, then continue from its input offset
+        out.truncate(state["output_offset"])
+        out.seek(state["output_offset"])
+        src.seek(state["input_offset"])
+        lines = _Lines(src, state["lines"])
+        if fmt == "csv" and state["header"] is None:
+            state["header"] = next(csv.reader(lines))
+        records = read_records(lines, fmt, state["header"], text_field, id_field)
+
+        # apply_async with a bounded window instead of imap, which would read the whole
+        # input ahead; results are written strictly in submission order
+        pending = deque()
+        with Pool(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+            chunks = _chunks(records, lines, chunk_size)
+            while True:
+                for chunk, position in chunks:
+                    pending.append((pool.apply_async(_score_chunk, (chunk,)), len(chunk), position))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                result, size, (state["lines"], state["input_offset"]) = pending.popleft()
+                out.write(result.get())
+                out.flush()
+                os.fsync(out.fileno())
+                state["output_offset"] = out.tell()
+                _save_checkpoint(checkpoint, state)
+                scored += size
+
+    os.remove(checkpoint)
+    elapsed = time.perf_counter() - start
+    log.info(f"Scored {scored} texts in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):.0f}/s)")
+    return scored
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score a file with the moderation model")
+    parser.add_argument("input")
+    parser.add_argument("output", help="NDJSON output, one row per scored input record")
+    parser.add_argument("--format", choices=("auto",) + FORMATS, default="auto")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Default: CPU count")
+    parser.add_argument("--checkpoint", default=None, help="Default: <output>.ckpt")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--text-field", default="text", help="CSV column / NDJSON key")
+    parser.add_argument("--id-field", default="id", help="Copied to the output when present")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or f"{args.output}.ckpt"
+    if args.restart and os.path.isfile(checkpoint):
+        os.remove(checkpoint)
+    score_file(
+        args.input,
+        args.output,
+        args.format,
+        args.chunk_size,
+        args.workers,
+        checkpoint,
+        args.model,
+        args.text_field,
+        args.id_field,
+    )
+
+
+if __name__ == "__main__":
+    main()
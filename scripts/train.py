@@ -1,43 +1,204 @@
+import argparse
+import json
 import os
-import sys
 import shutil
+import sys
 from collections import Counter
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.linear_model import SGDClassifier
-from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV
+from sklearn.pipeline import Pipeline
 
+from scripts.features import vectorize_cached
+from src.classifier import compact_path, metadata_path
 from src.config import DATA_DIR, MODEL_DIR
+from src.engine import export_compact
 from src.logger import get_logger
 
 log = get_logger("train")
 
 MODEL_PATH = os.path.join(MODEL_DIR, "classifier.pkl")
+FEATURE_CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# Classifier settings searched by --search; only losses with predict_proba
+SEARCH_SPACE = {
+    "loss": ["modified_huber", "log_loss"],
+    "alpha": [1e-6, 1e-5, 1e-4, 1e-3],
+    "penalty": ["l2", "elasticnet"],
+    "class_weight": ["balanced", None],
+}
+
+
+def parse_labeled_line(line: str) -> tuple[str, str] | None:
+    # fastText format: "__label__<label> <text>"
+    line = line.strip()
+    if not line:
+        return None
+    parts = line.split(" ", 1)
+    if len(parts) < 2:
+        return None
+    return parts[0].replace("__label__", ""), parts[1]
 
 
 def load_data(filepath: str) -> tuple[list[str], list[str]]:
     texts, labels = [], []
     with open(filepath, "r", encoding="utf-8") as f:
         for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split(" ", 1)
-            if len(parts) < 2:
+            parsed = parse_labeled_line(line)
+            if parsed is None:
                 continue
-            label = parts[0].replace("__label__", "")
-            text = parts[1]
+            label, text = parsed
             labels.append(label)
             texts.append(text)
     return texts, labels
 
 
-def train() -> None:
+def _install(src: str, dst: str) -> None:
+    # Replace atomically: running API workers may have the current file memory-mapped
+    tmp_path = f"{dst}.tmp"
+    shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def evaluate(pipeline, test_path: str) -> dict | None:
+    if not os.path.isfile(test_path):
+        log.warning(f"No test file at {test_path}, skipping evaluation.")
+        return None
+    X_test, y_test = load_data(test_path)
+    y_pred = pipeline.predict(X_test)
+    log.info(f"Test results ({len(X_test)} samples):")
+    print(classification_report(y_test, y_pred))
+    return classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+
+
+def publish(pipeline, metadata: dict | None = None) -> str:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    versioned_path = os.path.join(MODEL_DIR, f"classifier_{timestamp}.pkl")
+    joblib.dump(pipeline, versioned_path)
+    versioned_size = os.path.getsize(versioned_path) / 1024
+    log.info(f"Saved versioned: {versioned_path} ({versioned_size:.0f} KB)")
+
+    versioned_meta = metadata_path(versioned_path)
+    with open(versioned_meta, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": timestamp, "created_at": datetime.now().isoformat(), **(metadata or {})},
+            f,
+            indent=2,
+        )
+
+    versioned_compact = compact_path(versioned_path)
+    try:
+        export_compact(pipeline, versioned_compact, version=timestamp)
+        compact_size = os.path.getsize(versioned_compact) / 1024
+        log.info(f"Saved compact: {versioned_compact} ({compact_size:.0f} KB)")
+    except ValueError as e:
+        versioned_compact = None
+        log.warning(f"Compact export skipped: {e}")
+
+    # Install metadata and compact artifact before the pickle, so a watcher that
+    # reacts to the pickle sees a consistent set of files
+    _install(versioned_meta, metadata_path(MODEL_PATH))
+    latest_compact = compact_path(MODEL_PATH)
+    if versioned_compact:
+        _install(versioned_compact, latest_compact)
+    elif os.path.isfile(latest_compact):
+        os.remove(latest_compact)
+    _install(versioned_path, MODEL_PATH)
+    log.info(f"Saved latest: {MODEL_PATH}")
+    return versioned_path
+
+
+def build_vectorizer(kind: str = "tfidf", hash_bits: int = 18):
+    if kind == "hashing":
+        # Same char_wb n-grams and sublinear tf-idf, but n-grams are hashed into a fixed
+        # 2^hash_bits space, so the model stores only the idf array and no vocabulary
+        return Pipeline(
+            [
+                (
+                    "hash",
+                    HashingVectorizer(
+                        analyzer="char_wb",
+                        ngram_range=(2, 5),
+                        n_features=2**hash_bits,
+                        alternate_sign=False,
+                        norm=None,
+                    ),
+                ),
+                ("idf", TfidfTransformer(sublinear_tf=True)),
+            ]
+        )
+    return TfidfVectorizer(
+        analyzer="char_wb",
+        ngram_range=(2, 5),
+        max_features=80000,
+        sublinear_tf=True,
+        strip_accents=None,
+    )
+
+
+def build_pipeline(vectorizer, classifier) -> Pipeline:
+    steps = vectorizer.steps if isinstance(vectorizer, Pipeline) else [("tfidf", vectorizer)]
+    return Pipeline([*steps, ("clf", classifier)])
+
+
+def build_classifier(**params) -> SGDClassifier:
+    return SGDClassifier(
+        **{
+            "loss": "modified_huber",
+            "class_weight": "balanced",
+            "max_iter": 1000,
+            "tol": 1e-3,
+            "random_state": 42,
+            **params,
+        }
+    )
+
+
+def search_classifier(X, y, mode: str, n_iter: int = 20, cv: int = 3, n_jobs: int = -1):
+    # Every candidate fits on the cached matrix; joblib hands the memory-mapped CSR parts
+    # to the worker processes without copying them
+    if mode == "grid":
+        search = GridSearchCV(
+            build_classifier(), SEARCH_SPACE, scoring="f1_macro", cv=cv, n_jobs=n_jobs
+        )
+    else:
+        search = RandomizedSearchCV(
+            build_classifier(),
+            SEARCH_SPACE,
+            n_iter=n_iter,
+            scoring="f1_macro",
+            cv=cv,
+            n_jobs=n_jobs,
+            random_state=42,
+        )
+    search.fit(X, y)
+    log.info(
+        f"Best of {len(search.cv_results_['params'])} candidates "
+        f"(f1_macro {search.best_score_:.4f}): {search.best_params_}"
+    )
+    return search.best_estimator_, {
+        "mode": mode,
+        "candidates": len(search.cv_results_["params"]),
+        "best_params": search.best_params_,
+        "best_cv_f1_macro": round(float(search.best_score_), 4),
+    }
+
+
+def train(
+    search: str | None = None,
+    n_iter: int = 20,
+    cv: int = 3,
+    n_jobs: int = -1,
+    cache_dir: str | None = FEATURE_CACHE_DIR,
+    vectorizer: str = "tfidf",
+    hash_bits: int = 18,
+) -> None:
     train_path = os.path.join(DATA_DIR, "train.txt")
     test_path = os.path.join(DATA_DIR, "test.txt")
 
@@ -55,43 +216,53 @@ def train() -> None:
         pct = count / len(y_train) * 100
         log.info(f"  {label}: {count} ({pct:.1f}%)")
 
-    pipeline = Pipeline([
-        ("tfidf", TfidfVectorizer(
-            analyzer="char_wb",
-            ngram_range=(2, 5),
-            max_features=80000,
-            sublinear_tf=True,
-            strip_accents=None,
-        )),
-        ("clf", SGDClassifier(
-            loss="modified_huber",
-            class_weight="balanced",
-            max_iter=1000,
-            tol=1e-3,
-            random_state=42,
-        )),
-    ])
+    fitted, features = vectorize_cached(X_train, build_vectorizer(vectorizer, hash_bits), cache_dir)
 
     log.info("Training...")
-    pipeline.fit(X_train, y_train)
+    metadata = {"train_samples": len(X_train), "vectorizer": vectorizer}
+    if search:
+        classifier, metadata["search"] = search_classifier(
+            features, y_train, search, n_iter, cv, n_jobs
+        )
+    else:
+        classifier = build_classifier().fit(features, y_train)
+    pipeline = build_pipeline(fitted, classifier)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    versioned_path = os.path.join(MODEL_DIR, f"classifier_{timestamp}.pkl")
-    joblib.dump(pipeline, versioned_path)
-    versioned_size = os.path.getsize(versioned_path) / 1024
-    log.info(f"Saved versioned: {versioned_path} ({versioned_size:.0f} KB)")
+    metadata["metrics"] = evaluate(pipeline, test_path)
+    publish(pipeline, metadata)
 
-    shutil.copy2(versioned_path, MODEL_PATH)
-    log.info(f"Saved latest: {MODEL_PATH}")
 
-    if os.path.isfile(test_path):
-        X_test, y_test = load_data(test_path)
-        y_pred = pipeline.predict(X_test)
-        log.info(f"Test results ({len(X_test)} samples):")
-        print(classification_report(y_test, y_pred))
-    else:
-        log.warning(f"No test file at {test_path}, skipping evaluation.")
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train and publish the moderation model")
+    parser.add_argument(
+        "--search",
+        choices=("grid", "random"),
+        default=None,
+        help="Hyperparameter search over SEARCH_SPACE instead of one fit",
+    )
+    parser.add_argument("--n-iter", type=int, default=20, help="Candidates for random search")
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="-1 uses all cores")
+    parser.add_argument("--cache-dir", default=FEATURE_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="Always re-vectorize")
+    parser.add_argument("--vectorizer", choices=("tfidf", "hashing"), default="tfidf")
+    parser.add_argument(
+        "--hash-bits",
+        type=int,
+        default=18,
+        help="Hashing space is 2^hash-bits columns (--vectorizer hashing)",
+    )
+    args = parser.parse_args()
+    train(
+        args.search,
+        args.n_iter,
+        args.cv,
+        args.n_jobs,
+        None if args.no_cache else args.cache_dir,
+        args.vectorizer,
+        args.hash_bits,
+    )
 
 
 if __name__ == "__main__":
-    train()
+    main()
@@ -0,0 +1,147 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from src.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_LIMIT,
+    ADMISSION_QUEUE_TIMEOUT_MS,
+    ADMISSION_TARGET_MS,
+)
+from src.logger import get_logger
+from src.metrics import (
+    ADMISSION_INFLIGHT,
+    ADMISSION_LIMIT,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_REJECTED,
+)
+from src.tracing import span
+
+log = get_logger("admission")
+
+# Lower value wins; each class may only use its share of the concurrency limit, so under
+# pressure /predict keeps headroom that /predict/batch and /predict/explain cannot take
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+SHARES = (1.0, 0.8, 0.6)
+
+INITIAL_LIMIT = 32
+BACKOFF = 0.9
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Global AIMD concurrency limit around model calls. The limit grows by ~1 per window
+    # of fast high-priority requests and shrinks by BACKOFF when one misses the target
+    # latency. Requests over the limit queue only while Little's law
+    # (wait = queued * latency / limit) says they can start within the queue timeout.
+    def __init__(
+        self,
+        target_ms: float = ADMISSION_TARGET_MS,
+        max_limit: int = ADMISSION_MAX_LIMIT,
+        queue_timeout_ms: float = ADMISSION_QUEUE_TIMEOUT_MS,
+        enabled: bool = ADMISSION_ENABLED,
+    ):
+        self.enabled = enabled
+        self.target = target_ms / 1000
+        self.max_limit = max(1, max_limit)
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.limit = float(min(INITIAL_LIMIT, self.max_limit))
+        self.inflight = 0
+        self._latency = self.target / 2
+        self._last_decrease = 0.0
+        self._waiters = [deque() for _ in SHARES]
+        ADMISSION_LIMIT.set(self.limit)
+
+    def _capacity(self, priority: int) -> int:
+        return max(1, int(self.limit * SHARES[priority]))
+
+    def _estimated_wait(self, priority: int) -> float:
+        ahead = sum(len(waiters) for waiters in self._waiters[: priority + 1])
+        return (ahead + 1) * self._latency / self.limit
+
+    def _reject(self, priority: int, wait: float):
+        name = next(k for k, v in PRIORITIES.items() if v == priority)
+        ADMISSION_REJECTED.labels(priority=name).inc()
+        raise Overloaded(max(1, math.ceil(wait)))
+
+    async def acquire(self, priority: int) -> None:
+        if not self.enabled:
+            return
+        waiting = any(self._waiters[: priority + 1])
+        if not waiting and self.inflight < self._capacity(priority):
+            self.inflight += 1
+            ADMISSION_INFLIGHT.set(self.inflight)
+            return
+
+        wait = self._estimated_wait(priority)
+        if wait > self.queue_timeout:
+            self._reject(priority, wait)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        start = time.perf_counter()
+        try:
+            # The slot is handed over (inflight already counted) by _wake
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # From 3.12 wait_for can time out a future _release_slot resolved in the same
+            # loop iteration; that slot was already counted for us, so take it
+            if not (future.done() and not future.cancelled()):
+                if future in self._waiters[priority]:
+                    self._waiters[priority].remove(future)
+                self._reject(priority, wait)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if future in self._waiters[priority]:
+                self._waiters[priority].remove(future)
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - start)
+
+    def release(self, priority: int, latency: float) -> None:
+        if not self.enabled:
+            return
+        self._latency += 0.1 * (latency - self._latency)
+        if priority == PRIORITIES["high"]:
+            now = time.perf_counter()
+            if latency > self.target:
+                # At most one decrease per observed latency, not one per slow request
+                if now - self._last_decrease > self._latency:
+                    self.limit = max(1.0, self.limit * BACKOFF)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            ADMISSION_LIMIT.set(self.limit)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.inflight -= 1
+        for priority, waiters in enumerate(self._waiters):
+            while waiters and self.inflight < self._capacity(priority):
+                future = waiters.popleft()
+                if not future.done():
+                    self.inflight += 1
+                    future.set_result(None)
+            if waiters:
+                # Lower classes never overtake a class that is still waiting
+                break
+        ADMISSION_INFLIGHT.set(self.inflight)
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        level = PRIORITIES[priority]
+        with span("admission"):
+            await self.acquire(level)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(level, time.perf_counter() - start)
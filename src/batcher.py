@@ -0,0 +1,89 @@
+import asyncio
+
+from src.config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+from src.logger import get_logger
+from src.metrics import BATCH_QUEUE_DEPTH, BATCH_SIZE
+
+log = get_logger("batcher")
+
+
+class MicroBatcher:
+    # fn takes a list of items and must return one result per item, in order
+
+    def __init__(
+        self,
+        fn,
+        max_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        executor=None,
+    ):
+        self._fn = fn
+        self._max_size = max(1, max_size)
+        self._max_wait = max(0.0, max_wait_ms) / 1000
+        self._executor = executor
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._inflight = set()
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._collect())
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, item):
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future))
+        BATCH_QUEUE_DEPTH.observe(self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            while len(batch) < self._max_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list) -> None:
+        BATCH_SIZE.observe(len(batch))
+        items = [item for item, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, self._fn, items)
+            if len(results) != len(items):
+                # zip() would leave the unmatched callers waiting forever
+                raise RuntimeError(
+                    f"Batch function returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            log.error(f"Batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
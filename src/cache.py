@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+
+from src.config import CACHE_SIZE, CACHE_TTL
+from src.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+_MISSING = object()
+
+
+class PredictionCache:
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                CACHE_MISSES.inc()
+                return default
+            value, stored_at = entry
+            if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                CACHE_EVICTIONS.labels(reason="expired").inc()
+                CACHE_MISSES.inc()
+                return default
+            self._data.move_to_end(key)
+        CACHE_HITS.inc()
+        return value
+
+    def put(self, key, value) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                CACHE_EVICTIONS.labels(reason="capacity").inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
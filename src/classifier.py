@@ -1,27 +1,141 @@
+import hashlib
+import json
 import os
 import re
+import threading
+from typing import NamedTuple
 
 import joblib
 import numpy as np
 
-from src.config import MODEL_DIR, REVIEW_THRESHOLD
+from src.cache import PredictionCache
+from src.config import (
+    CONFIDENCE_THRESHOLD,
+    MODEL_DIR,
+    MODEL_FORMAT,
+    MODEL_MMAP,
+    REVIEW_THRESHOLD,
+    RULES_PATH,
+)
+from src.engine import load_compact
 from src.logger import get_logger
+from src.metrics import RULE_SHORT_CIRCUITS
+from src.rules import RuleEngine, RuleMatch, load_rules
+from src.tracing import span
 
 log = get_logger("classifier")
 
 
+def compact_path(model_path) -> str:
+    return os.path.splitext(str(model_path))[0] + ".compact"
+
+
+def metadata_path(model_path) -> str:
+    return os.path.splitext(str(model_path))[0] + ".json"
+
+
+def file_version(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def model_version(model_path) -> str:
+    # Version recorded by train.py next to the model, else a content hash
+    meta_path = metadata_path(model_path)
+    if os.path.isfile(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            version = json.load(f).get("version")
+        if version:
+            return version
+    return file_version(model_path)
+
+
+WARMUP_TEXTS = [
+    "Samsung Galaxy S24 Ultra 256GB",
+    "Vibrator Wand Massager 10 Speed Rechargeable",
+    "go fuck yourself moron",
+    "Arçelik No Frost Buzdolabı 540 Litre",
+]
+
+
+class LoadedModel(NamedTuple):
+    pipeline: object
+    vectorizer: object
+    estimator: object
+    version: str
+    path: str
+
+
 class TextClassifier:
-    def __init__(self):
-        model_path = os.path.join(MODEL_DIR, "classifier.pkl")
+    def __init__(
+        self, model_path=None, cache: PredictionCache | None = None, rules: RuleEngine | None = None
+    ):
+        self._cache = cache if cache is not None else PredictionCache()
+        self.rules = rules if rules is not None else load_rules(RULES_PATH)
+        self._load_lock = threading.Lock()
+        self._names = None
+        self.load(model_path or os.path.join(MODEL_DIR, "classifier.pkl"))
+
+    @property
+    def version(self) -> str:
+        return self._loaded.version
+
+    @property
+    def _model(self):
+        return self._loaded.pipeline
 
-        if not os.path.isfile(model_path):
+    @property
+    def _vectorizer(self):
+        return self._loaded.vectorizer
+
+    @property
+    def _estimator(self):
+        return self._loaded.estimator
+
+    @property
+    def _model_path(self) -> str:
+        return self._loaded.path
+
+    def load(self, model_path, warmup: bool = True) -> str:
+        with self._load_lock:
+            return self._load(str(model_path), warmup)
+
+    def _load(self, model_path: str, warmup: bool) -> str:
+        # Everything is built and warmed up before a single attribute swap, so requests
+        # in flight keep scoring with the previous model until the new one is ready
+        compact = compact_path(model_path)
+        use_compact = MODEL_FORMAT == "compact" or (
+            MODEL_FORMAT == "auto" and os.path.isfile(compact)
+        )
+        path = compact if use_compact else model_path
+        if not os.path.isfile(path):
             raise FileNotFoundError(
-                f"Model not found: {model_path}\n"
-                f"Run 'python scripts/train.py' first."
+                f"Model not found: {path}\n" f"Run 'python scripts/train.py' first."
             )
 
-        self._model = joblib.load(model_path)
-        log.info(f"Model loaded from {model_path}")
+        if use_compact:
+            # Pickle-free artifact scored with NumPy/SciPy only
+            meta, vectorizer, estimator = load_compact(path)
+            model, version = None, meta.get("version") or file_version(path)
+        else:
+            # With mmap the idf vector and coefficient matrix are mapped straight from the
+            # pickle file, so every worker process shares one page-cache copy
+            model = joblib.load(path, mmap_mode="r" if MODEL_MMAP else None)
+            # Last step scores, everything before it vectorizes (tfidf, or hash + idf)
+            vectorizer = model[0] if len(model) == 2 else model[:-1]
+            estimator = model[-1]
+            version = model_version(path)
+
+        loaded = LoadedModel(model, vectorizer, estimator, version, model_path)
+        if warmup:
+            self._infer(loaded, WARMUP_TEXTS)
+        self._loaded = loaded
+        self._cache.clear()
+        log.info(f"Model loaded from {path} (version {version})")
+        return version
 
     @staticmethod
     def _clean(text: str) -> str:
@@ -30,69 +144,206 @@ class TextClassifier:
         text = text.replace("\n", " ")
         return text
 
-    def predict(self, text: str) -> tuple[str, float]:
-        text = self._clean(text)
-        if not text:
-            return ("product", 1.0)
+    @staticmethod
+    def _infer(model: LoadedModel, cleaned: list[str]) -> list[tuple[str, float, np.ndarray]]:
+        # Vectorize once and reuse the sparse matrix for both label and probabilities
+        with span("vectorize"):
+            X = model.vectorizer.transform(cleaned)
+        with span("score"):
+            labels = model.estimator.predict(X)
+            probas = model.estimator.predict_proba(X)
+        return [(str(label), float(np.max(proba)), proba) for label, proba in zip(labels, probas)]
 
-        label = self._model.predict([text])[0]
-        proba = self._model.predict_proba([text])[0]
-        confidence = float(np.max(proba))
-        return (label, confidence)
+    def _match_rules(self, cleaned: list[str], results: list) -> list[RuleMatch | None]:
+        # Block terms and exact allow titles short-circuit the model for those texts
+        rules = [None] * len(cleaned)
+        if self.rules is None:
+            return rules
+        with span("rules"):
+            for i, text in enumerate(cleaned):
+                rule = self.rules.match(text) if text else None
+                if rule is not None:
+                    rules[i] = rule
+                    results[i] = (rule.label, 1.0, None)
+                    RULE_SHORT_CIRCUITS.labels(action=rule.action, label=rule.label).inc()
+        return rules
 
-    def predict_batch(self, texts: list[str]) -> list[tuple[str, float]]:
-        cleaned = [self._clean(t) for t in texts]
-        labels = self._model.predict(cleaned)
-        probas = self._model.predict_proba(cleaned)
-        return [
-            (label, float(np.max(proba)))
-            for label, proba in zip(labels, probas)
-        ]
+    def _score(
+        self, texts: list[str]
+    ) -> tuple[str, list[tuple[str, float, np.ndarray | None]], list[RuleMatch | None]]:
+        with span("clean"):
+            cleaned = [self._clean(t) for t in texts]
+        model = self._loaded
+        version = model.version
+        results = [("product", 1.0, None)] * len(cleaned)
+        rules = self._match_rules(cleaned, results)
 
-    def is_allowed(self, text: str, threshold: float = 0.5) -> bool:
-        label, confidence = self.predict(text)
-        if label == "product" and confidence >= threshold:
-            return True
-        return False
+        misses = {}
+        with span("cache"):
+            for i, text in enumerate(cleaned):
+                if not text or rules[i] is not None:
+                    continue
+                hit = self._cache.get((version, text))
+                if hit is not None:
+                    results[i] = hit
+                else:
+                    misses.setdefault(text, []).append(i)
 
-    def get_detail(self, text: str) -> dict:
-        label, confidence = self.predict(text)
+        if misses:
+            unique = list(misses)
+            for text, result in zip(unique, self._infer(model, unique)):
+                self._cache.put((version, text), result)
+                for i in misses[text]:
+                    results[i] = result
+        return version, results, rules
+
+    @staticmethod
+    def _allowed(label: str, confidence: float, threshold: float = CONFIDENCE_THRESHOLD) -> bool:
+        return label == "product" and confidence >= threshold
+
+    @classmethod
+    def _detail(
+        cls, text: str, label: str, confidence: float, version: str, rule: RuleMatch | None = None
+    ) -> dict:
         return {
             "text": text[:100],
             "label": label,
             "confidence": round(confidence, 4),
-            "allowed": self.is_allowed(text),
+            "allowed": cls._allowed(label, confidence),
             "needs_review": confidence < REVIEW_THRESHOLD,
+            "model_version": version,
+            "rule": rule.name if rule is not None else None,
         }
 
-    def explain(self, text: str, top_n: int = 10) -> dict:
-        text = self._clean(text)
-        if not text:
-            return {"text": "", "label": "product", "confidence": 1.0, "probabilities": {}, "top_features": []}
+    def predict(self, text: str) -> tuple[str, float]:
+        label, confidence, _ = self._score([text])[1][0]
+        return (label, confidence)
 
-        vectorizer = self._model.named_steps["tfidf"]
-        classifier = self._model.named_steps["clf"]
+    def predict_batch(self, texts: list[str]) -> list[tuple[str, float]]:
+        return [(label, confidence) for label, confidence, _ in self._score(texts)[1]]
 
-        tfidf_vec = vectorizer.transform([text])
-        proba = self._model.predict_proba([text])[0]
-        pred_idx = proba.argmax()
-        pred_label = classifier.classes_[pred_idx]
+    def is_allowed(self, text: str, threshold: float = 0.5) -> bool:
+        label, confidence = self.predict(text)
+        return self._allowed(label, confidence, threshold)
 
-        weights = classifier.coef_[pred_idx]
-        feature_names = vectorizer.get_feature_names_out()
+    def get_detail(self, text: str) -> dict:
+        return self.get_detail_batch([text])[0]
 
-        nonzero = tfidf_vec.nonzero()[1]
-        scores = []
-        for i in nonzero:
-            s = float(tfidf_vec[0, i] * weights[i])
-            scores.append((feature_names[i], s))
+    def get_detail_batch(self, texts: list[str]) -> list[dict]:
+        version, results, rules = self._score(texts)
+        return [
+            self._detail(text, label, confidence, version, rule)
+            for text, (label, confidence, _), rule in zip(texts, results, rules)
+        ]
 
-        scores.sort(key=lambda x: abs(x[1]), reverse=True)
+    def _feature_names(self, model: LoadedModel):
+        # Built once per loaded model instead of on every explain call. Hashing models
+        # have no vocabulary, so the hasher itself is returned to name columns per text.
+        # Duck-typed so the compact serving path never imports scikit-learn
+        cached = self._names
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        steps = getattr(model.vectorizer, "steps", None)
+        first = steps[0][1] if steps else None
+        if first is not None and hasattr(first, "n_features") and not hasattr(first, "vocabulary_"):
+            names = first
+        else:
+            names = np.asarray(model.vectorizer.get_feature_names_out())
+        self._names = (model, names)
+        return names
 
-        return {
-            "text": text[:100],
-            "label": pred_label,
-            "confidence": round(float(proba[pred_idx]), 4),
-            "probabilities": {c: round(float(p), 4) for c, p in zip(classifier.classes_, proba)},
-            "top_features": [{"feature": f, "weight": round(w, 4)} for f, w in scores[:top_n]],
-        }
+    @staticmethod
+    def _hashed_names(hasher, text: str, columns: np.ndarray) -> list[str]:
+        # A column is named by the text's n-grams that hash into it, "|"-joined on collision.
+        # Only reached for pickled hashing models, which already loaded scikit-learn
+        from sklearn.utils import murmurhash3_32
+
+        grams = {}
+        for gram in set(hasher.build_analyzer()(text)):
+            column = abs(murmurhash3_32(gram, seed=0)) % hasher.n_features
+            grams.setdefault(column, []).append(gram)
+        return ["|".join(sorted(grams.get(int(c), []))) for c in columns]
+
+    @staticmethod
+    def _top_features(X, weights: np.ndarray, row: int, top_n: int):
+        # Contributions of the row's nonzero columns only: tfidf value * class weight
+        lo, hi = X.indptr[row], X.indptr[row + 1]
+        columns = X.indices[lo:hi]
+        contributions = X.data[lo:hi] * weights[columns]
+        magnitude = np.abs(contributions)
+        if len(columns) > top_n:
+            top = np.argpartition(-magnitude, top_n - 1)[:top_n]
+        else:
+            top = np.arange(len(columns))
+        top = top[np.argsort(-magnitude[top], kind="stable")]
+        return columns[top], contributions[top]
+
+    def explain(self, text: str, top_n: int = 10) -> dict:
+        return self.explain_batch([text], top_n)[0]
+
+    def explain_batch(self, texts: list[str], top_n: int = 10) -> list[dict]:
+        with span("clean"):
+            cleaned = [self._clean(t) for t in texts]
+        model = self._loaded
+        results = [
+            {
+                "text": "",
+                "label": "product",
+                "confidence": 1.0,
+                "probabilities": {},
+                "top_features": [],
+                "model_version": model.version,
+                "rule": None,
+            }
+        ] * len(cleaned)
+
+        # Same rule pass as predict, so /predict/explain never contradicts /predict
+        rules = self._match_rules(cleaned, [None] * len(cleaned))
+        for i, rule in enumerate(rules):
+            if rule is not None:
+                results[i] = {
+                    **results[i],
+                    "text": cleaned[i][:100],
+                    "label": rule.label,
+                    "rule": rule.name,
+                }
+
+        rows = [i for i, text in enumerate(cleaned) if text and rules[i] is None]
+        if not rows:
+            return results
+
+        classifier = model.estimator
+        classes = [str(c) for c in classifier.classes_]
+        feature_names = self._feature_names(model)
+        coef = classifier.coef_
+
+        with span("vectorize"):
+            X = model.vectorizer.transform([cleaned[i] for i in rows]).tocsr()
+        with span("score"):
+            probas = classifier.predict_proba(X)
+        with span("explain_features"):
+            for row, (i, proba) in enumerate(zip(rows, probas)):
+                pred_idx = int(proba.argmax())
+                # Binary models keep one coefficient row, for the positive class
+                if coef.shape[0] == 1:
+                    weights = coef[0] if pred_idx == 1 else -coef[0]
+                else:
+                    weights = coef[pred_idx]
+                columns, contributions = self._top_features(X, weights, row, top_n)
+                if isinstance(feature_names, np.ndarray):
+                    names = feature_names[columns]
+                else:
+                    names = self._hashed_names(feature_names, cleaned[i], columns)
+                results[i] = {
+                    "text": cleaned[i][:100],
+                    "label": classes[pred_idx],
+                    "confidence": round(float(proba[pred_idx]), 4),
+                    "probabilities": {c: round(float(p), 4) for c, p in zip(classes, proba)},
+                    "top_features": [
+                        {"feature": str(f), "weight": round(float(w), 4)}
+                        for f, w in zip(names, contributions)
+                    ],
+                    "model_version": model.version,
+                    "rule": None,
+                }
+        return results
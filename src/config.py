@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,15 +9,62 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or os.cpu_count() or 1
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_TARGET_MS = float(os.getenv("ADMISSION_TARGET_MS", "100"))
+ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "256"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "50"))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
 RATE_LIMIT = os.getenv("RATE_LIMIT", "60/minute")
+API_KEY_RATE_LIMIT = os.getenv("API_KEY_RATE_LIMIT", "600/minute")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite")
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "")
+RATE_LIMIT_PATH = Path(os.getenv("RATE_LIMIT_PATH", str(BASE_DIR / "data" / "ratelimit.db")))
 
 MODEL_DIR = Path(os.getenv("MODEL_DIR", str(BASE_DIR / "models")))
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() in ("1", "true", "yes")
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+SHADOW_MODEL = os.getenv("SHADOW_MODEL", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "100"))
+CANARY_PERCENT = float(os.getenv("CANARY_PERCENT", "0"))
 DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite")
 DB_PATH = Path(os.getenv("DB_PATH", str(BASE_DIR / "data" / "predictions.db")))
+DB_URL = os.getenv("DB_URL", "")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "0.5"))
+DB_FLUSH_ROWS = int(os.getenv("DB_FLUSH_ROWS", "500"))
+DB_FLUSH_TIMEOUT = float(os.getenv("DB_FLUSH_TIMEOUT", "5"))
+DB_QUEUE_SIZE = int(os.getenv("DB_QUEUE_SIZE", "10000"))
+DB_QUEUE_TIMEOUT = float(os.getenv("DB_QUEUE_TIMEOUT", "0.1"))
+
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))
+RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "1000"))
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(BASE_DIR / "data" / "archive")))
+
+RULES_PATH = os.getenv("RULES_PATH", "")
 
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.5"))
 REVIEW_THRESHOLD = float(os.getenv("REVIEW_THRESHOLD", "0.85"))
 
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+STREAM_MAX_WAIT = float(os.getenv("STREAM_MAX_WAIT", "30"))
+
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "0"))
+
 API_KEY = os.getenv("API_KEY", "")
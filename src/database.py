@@ -1,96 +1,359 @@
-import os
-import sqlite3
-from src.config import DB_PATH
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from src.config import DB_WRITE_BEHIND
+from src.storage import create_storage
+from src.tracing import span
+from src.writer import WriteBehindWriter
+
+# Rollup buckets are stored as the bucket's start time: prefix of created_at + zero padding
+GRANULARITIES = {
+    "minute": (16, ":00", timedelta(minutes=1)),
+    "hour": (13, ":00:00", timedelta(hours=1)),
+    "day": (10, " 00:00:00", timedelta(days=1)),
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _timestamp(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def bucket_start(created_at: str, granularity: str) -> str:
+    length, padding, _ = GRANULARITIES[granularity]
+    return created_at[:length] + padding
 
 
 class PredictionDB:
-    def __init__(self, db_path=None):
-        path = str(db_path or DB_PATH)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        self.conn = sqlite3.connect(path, check_same_thread=False)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT,
-                label TEXT,
-                confidence REAL,
-                allowed INTEGER,
-                created_at TEXT DEFAULT (datetime('now'))
-            )
-        """)
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT,
-                predicted_label TEXT,
-                correct_label TEXT,
-                created_at TEXT DEFAULT (datetime('now'))
-            )
-        """)
-        self.conn.commit()
+    def __init__(self, db_path=None, write_behind: bool = DB_WRITE_BEHIND, storage=None):
+        self.storage = storage or create_storage(db_path=db_path)
+        self._writer = WriteBehindWriter(self._write) if write_behind else None
+
+    def _write(self, rows: dict) -> None:
+        with span("db_write"), self.storage.transaction() as cur:
+            if rows.get("prediction"):
+                cur.executemany(
+                    "INSERT INTO predictions "
+                    "(text, label, confidence, allowed, created_at, model_version) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows["prediction"],
+                )
+                counts = Counter((row[1], row[3]) for row in rows["prediction"])
+                cur.executemany(
+                    "INSERT INTO prediction_counts (label, allowed, count) VALUES (?, ?, ?) "
+                    "ON CONFLICT (label, allowed) "
+                    "DO UPDATE SET count = prediction_counts.count + excluded.count",
+                    [(label, allowed, n) for (label, allowed), n in counts.items()],
+                )
+                rollups = Counter(
+                    (granularity, bucket_start(row[4], granularity), row[1], row[3])
+                    for row in rows["prediction"]
+                    for granularity in GRANULARITIES
+                )
+                cur.executemany(
+                    "INSERT INTO prediction_rollups (granularity, bucket, label, allowed, count) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (granularity, bucket, label, allowed) "
+                    "DO UPDATE SET count = prediction_rollups.count + excluded.count",
+                    [key + (n,) for key, n in rollups.items()],
+                )
+            if rows.get("shadow"):
+                cur.executemany(
+                    "INSERT INTO shadow_results (primary_version, candidate_version, "
+                    "primary_label, candidate_label, agree, primary_confidence, "
+                    "candidate_confidence, latency_ms, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows["shadow"],
+                )
+            if rows.get("feedback"):
+                cur.executemany(
+                    "INSERT INTO feedback "
+                    "(text, predicted_label, correct_label, created_at, model_version) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows["feedback"],
+                )
 
-    def save(self, text, label, confidence, allowed):
-        self.conn.execute(
-            "INSERT INTO predictions (text, label, confidence, allowed) VALUES (?, ?, ?, ?)",
-            (text[:500], label, confidence, int(allowed)),
+    def _query(self, sql, params=()):
+        with span("db_query"):
+            return self.storage.query(sql, params)
+
+    @property
+    def write_behind(self) -> bool:
+        return self._writer is not None
+
+    def _enqueue(self, kind, rows, block=True):
+        if self._writer is None:
+            self._write({kind: rows})
+            return
+        for row in rows:
+            self._writer.put(kind, row, block)
+
+    def ping(self):
+        self._query("SELECT 1")
+
+    def expired_predictions(self, cutoff: datetime, limit: int):
+        rows = self._query(
+            "SELECT id, text, label, confidence, allowed, created_at, model_version "
+            "FROM predictions "
+            "WHERE created_at < ? ORDER BY id LIMIT ?",
+            (_timestamp(cutoff), limit),
         )
-        self.conn.commit()
+        return [
+            {
+                "id": row[0],
+                "text": row[1],
+                "label": row[2],
+                "confidence": row[3],
+                "allowed": bool(row[4]),
+                "created_at": row[5],
+                "model_version": row[6],
+            }
+            for row in rows
+        ]
 
-    def get_stats(self):
-        cur = self.conn.execute("SELECT COUNT(*) FROM predictions")
-        total = cur.fetchone()[0]
+    def delete_predictions(self, cutoff: datetime, first_id: int, last_id: int) -> None:
+        # Deletes a chunk from expired_predictions: it takes expired rows in id order, so
+        # every expired row in the id range is in the chunk. A range keeps the statement at
+        # three parameters for any RETENTION_CHUNK_SIZE (older SQLite allows only 999)
+        with self.storage.transaction() as cur:
+            cur.execute(
+                "DELETE FROM predictions WHERE id BETWEEN ? AND ? AND created_at < ?",
+                (first_id, last_id, _timestamp(cutoff)),
+            )
+
+    def prune_rollups(self, cutoff: datetime, granularities=("minute", "hour")) -> int:
+        # Fine-grained buckets only matter for recent history; day rollups are kept forever
+        deleted = 0
+        with self.storage.transaction() as cur:
+            for granularity in granularities:
+                result = cur.execute(
+                    "DELETE FROM prediction_rollups WHERE granularity = ? AND bucket < ?",
+                    (granularity, bucket_start(_timestamp(cutoff), granularity)),
+                )
+                deleted += max(result.rowcount, 0)
+        return deleted
 
-        cur = self.conn.execute(
-            "SELECT label, COUNT(*) FROM predictions GROUP BY label ORDER BY COUNT(*) DESC"
+    def incremental_vacuum(self, pages: int = 0) -> bool:
+        return self.storage.reclaim(pages)
+
+    def vacuum(self) -> None:
+        self.flush()
+        self.storage.vacuum()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self.storage.close()
+
+    def save(self, text, label, confidence, allowed, model_version=None):
+        self.save_many([(text, label, confidence, allowed, model_version)])
+
+    def save_many(self, predictions, block=True):
+        # Rows are (text, label, confidence, allowed[, model_version])
+        created_at = _now()
+        self._enqueue(
+            "prediction",
+            [
+                (text[:500], label, confidence, int(allowed), created_at, (version or [None])[0])
+                for text, label, confidence, allowed, *version in predictions
+            ],
+            block,
         )
-        by_label = {row[0]: row[1] for row in cur.fetchall()}
 
-        cur = self.conn.execute("SELECT COUNT(*) FROM predictions WHERE allowed = 0")
-        blocked = cur.fetchone()[0]
+    def get_stats(self):
+        self.flush()
+        total, blocked, by_label = 0, 0, Counter()
+        for label, allowed, count in self._query(
+            "SELECT label, allowed, count FROM prediction_counts"
+        ):
+            total += count
+            by_label[label] += count
+            if not allowed:
+                blocked += count
 
         return {
             "total": total,
             "blocked": blocked,
             "allowed": total - blocked,
-            "by_label": by_label,
+            "by_label": dict(by_label.most_common()),
         }
 
-    def save_feedback(self, text, predicted_label, correct_label):
-        self.conn.execute(
-            "INSERT INTO feedback (text, predicted_label, correct_label) VALUES (?, ?, ?)",
-            (text[:500], predicted_label, correct_label),
+    def get_timeseries(self, start: datetime, end: datetime, granularity: str = "hour"):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity. Must be one of: {', '.join(GRANULARITIES)}")
+        self.flush()
+        rows = self._query(
+            "SELECT bucket, label, allowed, count FROM prediction_rollups "
+            "WHERE granularity = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+            (granularity, bucket_start(_timestamp(start), granularity), _timestamp(end)),
+        )
+
+        series = {}
+        for bucket, label, allowed, count in rows:
+            point = series.setdefault(
+                bucket, {"bucket": bucket, "total": 0, "allowed": 0, "blocked": 0, "by_label": {}}
+            )
+            point["total"] += count
+            point["allowed" if allowed else "blocked"] += count
+            point["by_label"][label] = point["by_label"].get(label, 0) + count
+        return list(series.values())
+
+    def save_shadow_many(self, results):
+        # Rows are (primary_version, candidate_version, primary_label, candidate_label,
+        # agree, primary_confidence, candidate_confidence, latency_ms)
+        created_at = _now()
+        self._enqueue(
+            "shadow",
+            [
+                (pv, cv, pl, cl, int(agree), pc, cc, ms, created_at)
+                for pv, cv, pl, cl, agree, pc, cc, ms in results
+            ],
+        )
+
+    def get_shadow_summary(self, candidate_version=None):
+        self.flush()
+        where, params = "", ()
+        if candidate_version is not None:
+            where, params = "WHERE candidate_version = ? ", (candidate_version,)
+        rows = self._query(
+            "SELECT candidate_version, primary_label, COUNT(*), SUM(agree), AVG(latency_ms) "
+            f"FROM shadow_results {where}GROUP BY candidate_version, primary_label",
+            params,
+        )
+        summary = {}
+        for version, label, total, agree, latency in rows:
+            summary.setdefault(version, {})[label] = {
+                "total": total,
+                "agree": agree,
+                "disagree": total - agree,
+                "agreement_rate": round(agree / total, 4),
+                "avg_latency_ms": round(latency, 4),
+            }
+        return summary
+
+    def save_feedback(self, text, predicted_label, correct_label, model_version=None, block=True):
+        self._enqueue(
+            "feedback", [(text[:500], predicted_label, correct_label, _now(), model_version)], block
         )
-        self.conn.commit()
 
-    def get_feedback(self, limit=50):
-        cur = self.conn.execute(
-            "SELECT text, predicted_label, correct_label, created_at "
-            "FROM feedback ORDER BY id DESC LIMIT ?",
-            (limit,),
+    def _page(self, table, columns, filters, limit, before_id=None, after_id=None):
+        # Keyset pagination: rows with id < before_id, newest first, or with
+        # id > after_id, oldest first
+        clauses = [f"{sql} ?" for sql, value in filters if value is not None]
+        params = [value for _, value in filters if value is not None]
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        order = "ASC" if after_id is not None else "DESC"
+        return self._query(
+            f"SELECT id, {', '.join(columns)} FROM {table} {where}ORDER BY id {order} LIMIT ?",
+            (*params, limit),
+        )
+
+    def _iterate(self, page, chunk_size, **kwargs):
+        self.flush()
+        cursor = "after_id" if kwargs.get("after_id") is not None else "before_id"
+        position = kwargs.pop(cursor, None)
+        while True:
+            rows = page(limit=chunk_size, flush=False, **{cursor: position}, **kwargs)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            position = rows[-1]["id"]
+
+    def get_feedback(
+        self,
+        limit=50,
+        before_id=None,
+        predicted_label=None,
+        correct_label=None,
+        since=None,
+        until=None,
+        flush=True,
+        after_id=None,
+    ):
+        if flush:
+            self.flush()
+        rows = self._page(
+            "feedback",
+            ["text", "predicted_label", "correct_label", "created_at", "model_version"],
+            [
+                ("predicted_label =", predicted_label),
+                ("correct_label =", correct_label),
+                ("created_at >=", since and _timestamp(since)),
+                ("created_at <", until and _timestamp(until)),
+            ],
+            limit,
+            before_id,
+            after_id,
         )
         return [
             {
-                "text": row[0],
-                "predicted_label": row[1],
-                "correct_label": row[2],
-                "created_at": row[3],
+                "id": row[0],
+                "text": row[1],
+                "predicted_label": row[2],
+                "correct_label": row[3],
+                "created_at": row[4],
+                "model_version": row[5],
             }
-            for row in cur.fetchall()
+            for row in rows
         ]
 
-    def get_recent(self, limit=20):
-        cur = self.conn.execute(
-            "SELECT text, label, confidence, allowed, created_at "
-            "FROM predictions ORDER BY id DESC LIMIT ?",
-            (limit,),
+    def iter_feedback(self, chunk_size=1000, **filters):
+        return self._iterate(self.get_feedback, chunk_size, **filters)
+
+    def get_recent(
+        self,
+        limit=20,
+        before_id=None,
+        label=None,
+        allowed=None,
+        min_confidence=None,
+        max_confidence=None,
+        since=None,
+        until=None,
+        flush=True,
+    ):
+        if flush:
+            self.flush()
+        rows = self._page(
+            "predictions",
+            ["text", "label", "confidence", "allowed", "created_at", "model_version"],
+            [
+                ("label =", label),
+                ("allowed =", None if allowed is None else int(allowed)),
+                ("confidence >=", min_confidence),
+                ("confidence <=", max_confidence),
+                ("created_at >=", since and _timestamp(since)),
+                ("created_at <", until and _timestamp(until)),
+            ],
+            limit,
+            before_id,
         )
         return [
             {
-                "text": row[0],
-                "label": row[1],
-                "confidence": row[2],
-                "allowed": bool(row[3]),
-                "created_at": row[4],
+                "id": row[0],
+                "text": row[1],
+                "label": row[2],
+                "confidence": row[3],
+                "allowed": bool(row[4]),
+                "created_at": row[5],
+                "model_version": row[6],
             }
-            for row in cur.fetchall()
+            for row in rows
         ]
+
+    def iter_recent(self, chunk_size=1000, **filters):
+        return self._iterate(self.get_recent, chunk_size, **filters)
@@ -0,0 +1,219 @@
+import json
+import re
+import struct
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Compact model artifact: a small JSON header followed by raw, 64-byte aligned arrays.
+# Everything needed to score is read with np.memmap, so loading is near-instant,
+# nothing is unpickled, and worker processes share the arrays through the page cache.
+MAGIC = b"TMC1"
+ALIGN = 64
+
+# SGDClassifier losses CompactLinearModel can turn into probabilities
+PROBA_LOSSES = ("log_loss", "modified_huber")
+
+_WHITE_SPACES = re.compile(r"\s\s+")
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_artifact(path, meta: dict, arrays: dict) -> None:
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({"meta": meta, "arrays": layout}, ensure_ascii=False).encode("utf-8")
+    data_start = _align(len(MAGIC) + 4 + len(header))
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+
+
+def load_artifact(path) -> tuple[dict, dict]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a compact model artifact: {path}")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+
+    data_start = _align(len(MAGIC) + 4 + header_len)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.empty(shape, dtype=spec["dtype"])
+            continue
+        arrays[name] = np.memmap(
+            path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape
+        )
+    return header["meta"], arrays
+
+
+class CompactVectorizer:
+    # Reimplements TfidfVectorizer(analyzer="char_wb").transform with a sorted term array
+    def __init__(self, meta: dict, arrays: dict):
+        self.ngram_range = tuple(meta["ngram_range"])
+        self.lowercase = meta["lowercase"]
+        self.binary = meta["binary"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.norm = meta["norm"]
+        self.terms = arrays["terms"]
+        self.columns = arrays["columns"]
+        self.idf = arrays.get("idf")
+        self.n_features = meta["n_features"]
+        self._feature_names = None
+
+    def _ngrams(self, doc: str) -> list[str]:
+        if self.lowercase:
+            doc = doc.lower()
+        doc = _WHITE_SPACES.sub(" ", doc)
+        min_n, max_n = self.ngram_range
+        grams = []
+        append = grams.append
+        for w in doc.split():
+            w = " " + w + " "
+            w_len = len(w)
+            for n in range(min_n, max_n + 1):
+                offset = 0
+                append(w[offset : offset + n])
+                while offset + n < w_len:
+                    offset += 1
+                    append(w[offset : offset + n])
+                if offset == 0:
+                    break
+        return grams
+
+    def _lookup(self, grams: list[str]) -> np.ndarray:
+        if not grams or not len(self.terms):
+            return np.empty(0, dtype=np.int64)
+        grams = np.asarray(grams)
+        pos = np.searchsorted(self.terms, grams)
+        pos[pos == len(self.terms)] = 0
+        return self.columns[pos[self.terms[pos] == grams]]
+
+    def transform(self, texts) -> csr_matrix:
+        indptr, indices, data = [0], [], []
+        for doc in texts:
+            cols, counts = np.unique(self._lookup(self._ngrams(doc)), return_counts=True)
+            values = counts.astype(np.float32)
+            if self.binary:
+                values[:] = 1
+            elif self.sublinear_tf:
+                values = np.log(values) + 1
+            if self.idf is not None:
+                values *= self.idf[cols]
+            if self.norm == "l2" and len(values):
+                values /= np.sqrt(np.dot(values, values))
+            elif self.norm == "l1" and len(values):
+                values /= np.abs(values).sum()
+            indices.append(cols)
+            data.append(values)
+            indptr.append(indptr[-1] + len(cols))
+
+        return csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0, dtype=np.float32),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+                np.asarray(indptr),
+            ),
+            shape=(len(indptr) - 1, self.n_features),
+        )
+
+    def get_feature_names_out(self) -> np.ndarray:
+        if self._feature_names is None:
+            names = np.empty(self.n_features, dtype=self.terms.dtype)
+            names[self.columns] = self.terms
+            self._feature_names = names
+        return self._feature_names
+
+
+class CompactLinearModel:
+    # Same predict / predict_proba semantics as SGDClassifier for the supported losses
+    def __init__(self, meta: dict, arrays: dict):
+        self.classes_ = np.asarray(meta["classes"])
+        self.loss = meta["loss"]
+        self.coef_ = arrays["coef"]
+        self.intercept_ = arrays["intercept"]
+
+    def decision_function(self, X) -> np.ndarray:
+        scores = np.asarray(X @ self.coef_.T) + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X) -> np.ndarray:
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.decision_function(X)
+        if self.loss == "log_loss":
+            prob = 1.0 / (1.0 + np.exp(-scores))
+            if prob.ndim == 1:
+                return np.column_stack([1 - prob, prob])
+            return prob / prob.sum(axis=1, keepdims=True)
+
+        if self.loss == "modified_huber":
+            prob = (np.clip(scores, -1, 1) + 1) / 2
+            if prob.ndim == 1:
+                return np.column_stack([1 - prob, prob])
+            prob_sum = prob.sum(axis=1)
+            all_zero = prob_sum == 0
+            prob[all_zero, :] = 1
+            prob_sum[all_zero] = len(self.classes_)
+            return prob / prob_sum[:, None]
+
+        raise NotImplementedError(f"predict_proba is not supported for loss={self.loss!r}")
+
+
+def load_compact(path) -> tuple[dict, CompactVectorizer, CompactLinearModel]:
+    meta, arrays = load_artifact(path)
+    return meta, CompactVectorizer(meta, arrays), CompactLinearModel(meta, arrays)
+
+
+def export_compact(pipeline, path, version: str | None = None) -> None:
+    vectorizer, classifier = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if len(pipeline.steps) != 2 or getattr(vectorizer, "analyzer", None) != "char_wb":
+        raise ValueError("Compact export supports TfidfVectorizer(analyzer='char_wb') pipelines")
+    if vectorizer.preprocessor is not None or vectorizer.strip_accents:
+        raise ValueError("Compact export does not support custom preprocessing")
+    if getattr(classifier, "loss", None) not in PROBA_LOSSES:
+        raise ValueError(
+            f"Compact export needs a classifier with loss in {PROBA_LOSSES}, "
+            f"got {getattr(classifier, 'loss', None)!r}"
+        )
+
+    vocab = vectorizer.vocabulary_
+    terms = np.array(sorted(vocab))
+    columns = np.array([vocab[t] for t in terms], dtype=np.int32)
+
+    meta = {
+        "kind": "tfidf_char_wb",
+        "version": version,
+        "ngram_range": list(vectorizer.ngram_range),
+        "lowercase": bool(vectorizer.lowercase),
+        "binary": bool(vectorizer.binary),
+        "sublinear_tf": bool(vectorizer.sublinear_tf),
+        "norm": vectorizer.norm,
+        "n_features": len(vocab),
+        "classes": [str(c) for c in classifier.classes_],
+        "loss": classifier.loss,
+    }
+    arrays = {
+        "terms": terms,
+        "columns": columns,
+        "coef": np.asarray(classifier.coef_, dtype=np.float32),
+        "intercept": np.asarray(classifier.intercept_, dtype=np.float32),
+    }
+    if vectorizer.use_idf:
+        arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float32)
+    save_artifact(path, meta, arrays)
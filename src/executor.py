@@ -0,0 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import INFERENCE_WORKERS
+from src.tracing import bind
+
+# Model calls run here instead of on Starlette's shared threadpool, so a burst of
+# inference can only saturate this pool and DB reads, /health and /metrics keep their threads.
+# NumPy/SciPy release the GIL for the heavy parts; scale across cores with API_WORKERS.
+inference_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+)
+
+
+async def run_inference(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, bind(fn, *args, **kwargs))
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 PREDICTION_COUNT = Counter(
     "prediction_total",
@@ -17,3 +17,127 @@ FEEDBACK_COUNT = Counter(
     "Total number of feedback submissions",
     ["predicted_label", "correct_label"],
 )
+
+BATCH_SIZE = Histogram(
+    "batch_size",
+    "Number of requests coalesced into one micro-batch",
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128],
+)
+
+BATCH_QUEUE_DEPTH = Histogram(
+    "batch_queue_depth",
+    "Micro-batcher queue depth observed at submission",
+    buckets=[0, 1, 2, 4, 8, 16, 32, 64, 128, 256],
+)
+
+CACHE_HITS = Counter(
+    "prediction_cache_hits_total",
+    "Prediction cache hits",
+)
+
+CACHE_MISSES = Counter(
+    "prediction_cache_misses_total",
+    "Prediction cache misses",
+)
+
+CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions_total",
+    "Prediction cache evictions",
+    ["reason"],
+)
+
+DB_QUEUE_DEPTH = Gauge(
+    "db_write_queue_depth",
+    "Rows waiting in the write-behind queue",
+)
+
+DB_FLUSH_SIZE = Histogram(
+    "db_flush_rows",
+    "Rows written per write-behind flush",
+    buckets=[1, 10, 50, 100, 250, 500, 1000, 5000],
+)
+
+DB_WRITES_DROPPED = Counter(
+    "db_writes_dropped_total",
+    "Rows dropped because the write-behind queue was full or a flush failed",
+    ["kind"],
+)
+
+ARCHIVED_ROWS = Counter(
+    "archived_predictions_total",
+    "Predictions moved from the live table into archive files",
+)
+
+SHADOW_COMPARISONS = Counter(
+    "shadow_comparisons_total",
+    "Shadow-scored items by primary label and whether the candidate agreed",
+    ["label", "agree"],
+)
+
+SHADOW_LATENCY = Histogram(
+    "shadow_latency_seconds",
+    "Candidate model latency per shadow-scored item, by primary label",
+    ["label"],
+    buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1],
+)
+
+SHADOW_SKIPPED = Counter(
+    "shadow_skipped_total",
+    "Items not shadow-scored because the shadow executor was saturated",
+)
+
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive concurrency limit for model calls",
+)
+
+ADMISSION_INFLIGHT = Gauge(
+    "admission_inflight",
+    "Admitted requests currently running model calls",
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25],
+)
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests rejected with 503 by the admission controller",
+    ["priority"],
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests rejected with 429, by bucket kind (api key or client ip)",
+    ["kind"],
+)
+
+STAGE_LATENCY = Histogram(
+    "stage_latency_seconds",
+    "Latency of each stage of request handling, by endpoint",
+    ["endpoint", "stage"],
+    buckets=[
+        0.00005,
+        0.0001,
+        0.00025,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+    ],
+)
+
+RULE_SHORT_CIRCUITS = Counter(
+    "rule_short_circuit_total",
+    "Predictions decided by the rule engine without calling the model",
+    ["action", "label"],
+)
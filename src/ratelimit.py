@@ -0,0 +1,195 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from src.config import (
+    API_KEY,
+    API_KEY_RATE_LIMIT,
+    RATE_LIMIT,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_PATH,
+    RATE_LIMIT_URL,
+)
+from src.logger import get_logger
+from src.metrics import RATE_LIMITED
+
+log = get_logger("ratelimit")
+
+UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+RATE_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+PRUNE_EVERY = 10000
+
+
+def parse_rate(spec: str) -> tuple[float, float]:
+    # "60/minute" or "100/5 minutes" -> (bucket capacity, tokens refilled per second)
+    match = RATE_PATTERN.match(spec.lower())
+    if not match:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    count, multiple, unit = match.groups()
+    period = int(multiple or 1) * UNITS[unit]
+    return float(count), int(count) / period
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class MemoryBucketStore:
+    # Single process only; each worker keeps its own buckets. Cheap enough to call on the
+    # event loop, while the other stores do I/O and run in the threadpool
+    blocking = False
+
+    def __init__(self, clock=time.time):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> tuple[bool, float]:
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+            granted = tokens >= cost
+            if granted:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return granted, tokens
+
+
+class SQLiteBucketStore:
+    # Buckets in a small shared file, updated with one atomic UPSERT ... RETURNING per
+    # request, so all worker processes on a host share the same limits. Counters are not
+    # worth fsyncing: synchronous=OFF, and a missing row is simply a full bucket.
+    TAKE = (
+        "INSERT INTO buckets (key, tokens, updated_at, granted) "
+        "VALUES (:key, :capacity - :cost, :now, 1) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "tokens = CASE WHEN {refill} >= :cost THEN {refill} - :cost ELSE {refill} END, "
+        "granted = {refill} >= :cost, "
+        "updated_at = :now "
+        "RETURNING granted, tokens"
+    ).format(refill="min(:capacity, tokens + max(0, :now - updated_at) * :rate)")
+
+    blocking = True
+
+    def __init__(self, path=RATE_LIMIT_PATH, clock=time.time):
+        self.path = str(path)
+        self._clock = clock
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._calls = 0
+        # One connection per process: a take is a single ~15 µs statement, so serializing
+        # threads on a lock costs less than a connection per threadpool thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("PRAGMA busy_timeout=100")
+        self._conn.execute("PRAGMA mmap_size=1048576")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL, updated_at REAL, granted INTEGER"
+            ") WITHOUT ROWID"
+        )
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> tuple[bool, float]:
+        now = self._clock()
+        with self._lock:
+            granted, tokens = self._conn.execute(
+                self.TAKE,
+                {"key": key, "capacity": capacity, "rate": rate, "cost": cost, "now": now},
+            ).fetchone()
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                # Rows idle long enough to have refilled completely are equivalent to no row
+                self._conn.execute(
+                    "DELETE FROM buckets WHERE updated_at < ?", (now - capacity / rate,)
+                )
+        return bool(granted), tokens
+
+
+class RedisBucketStore:
+    # Network store for limits shared across hosts. The whole refill-and-take runs in one
+    # Lua script on the server, using the server clock, so replicas never race or skew.
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local granted = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  granted = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {granted, tostring(tokens)}
+"""
+
+    blocking = True
+
+    def __init__(self, url=RATE_LIMIT_URL, client=None, prefix: str = "ratelimit:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("The redis rate limit backend needs: pip install redis") from e
+            if not url:
+                raise ValueError("RATE_LIMIT_URL must be set for the redis backend")
+            client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._take = client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> tuple[bool, float]:
+        granted, tokens = self._take(keys=[self._prefix + key], args=[capacity, rate, cost])
+        return bool(int(granted)), float(tokens)
+
+
+def create_bucket_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "sqlite":
+        return SQLiteBucketStore()
+    if backend == "redis":
+        return RedisBucketStore()
+    if backend == "memory":
+        return MemoryBucketStore()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+class RateLimiter:
+    # Token buckets per API key (when a valid key is sent) or else per client IP
+    def __init__(
+        self,
+        store=None,
+        ip_rate: str = RATE_LIMIT,
+        key_rate: str = API_KEY_RATE_LIMIT,
+        api_key: str = API_KEY,
+    ):
+        self.store = store or create_bucket_store()
+        self.ip_limit = parse_rate(ip_rate)
+        self.key_limit = parse_rate(key_rate)
+        self.api_key = api_key
+
+    def check(self, ip: str, key: str | None = None, cost: float = 1) -> None:
+        # Only the configured key gets its own bucket; random keys must not dodge the IP limit
+        if self.api_key and key == self.api_key:
+            bucket, (capacity, rate), kind = f"key:{key}", self.key_limit, "key"
+        else:
+            bucket, (capacity, rate), kind = f"ip:{ip}", self.ip_limit, "ip"
+        try:
+            granted, tokens = self.store.take(bucket, capacity, rate, cost)
+        except Exception as e:
+            # Fail open: an unavailable limiter store must not take the API down
+            log.error(f"Rate limit check failed: {e}")
+            return
+        if not granted:
+            RATE_LIMITED.labels(kind=kind).inc()
+            raise RateLimited(max(1, int((cost - tokens) / rate + 0.999)))
@@ -0,0 +1,106 @@
+import json
+import os
+import re
+import threading
+
+from src.classifier import compact_path, metadata_path, model_version
+from src.config import MODEL_DIR, MODEL_WATCH_INTERVAL
+from src.logger import get_logger
+
+log = get_logger("registry")
+
+VERSION_PATTERN = re.compile(r"^classifier_(\d{8}_\d{6})\.pkl$")
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = str(model_dir)
+
+    @property
+    def latest_path(self) -> str:
+        return os.path.join(self.model_dir, "classifier.pkl")
+
+    def path(self, version: str) -> str:
+        if version == "latest":
+            return self.latest_path
+        path = os.path.join(self.model_dir, f"classifier_{version}.pkl")
+        if not VERSION_PATTERN.match(os.path.basename(path)) or not os.path.isfile(path):
+            raise KeyError(version)
+        return path
+
+    def _describe(self, version: str, path: str) -> dict:
+        metadata = {}
+        meta_path = metadata_path(path)
+        if os.path.isfile(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        return {
+            "version": version,
+            "path": path,
+            "size_kb": round(os.path.getsize(path) / 1024),
+            "compact": os.path.isfile(compact_path(path)),
+            "created_at": metadata.get("created_at"),
+            "train_samples": metadata.get("train_samples"),
+            "metrics": metadata.get("metrics"),
+        }
+
+    def list_versions(self) -> list[dict]:
+        if not os.path.isdir(self.model_dir):
+            return []
+        versions = []
+        for name in os.listdir(self.model_dir):
+            match = VERSION_PATTERN.match(name)
+            if match:
+                versions.append(self._describe(match.group(1), os.path.join(self.model_dir, name)))
+        return sorted(versions, key=lambda v: v["version"], reverse=True)
+
+    def get(self, version: str) -> dict:
+        path = self.path(version)
+        if version == "latest":
+            version = model_version(path)
+        return self._describe(version, path)
+
+
+class ModelWatcher:
+    # Polls the latest model and hot-swaps the classifier when it changes. Only the pickle
+    # is watched: train.publish installs the .json and .compact first and the pickle last,
+    # so a change to the pickle means the whole set is in place
+    def __init__(self, clf, path=None, interval: float = MODEL_WATCH_INTERVAL):
+        self._clf = clf
+        self._path = str(path or clf._model_path)
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._signature = self._stat()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+
+    def _stat(self):
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def check(self) -> bool:
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        try:
+            version = self._clf.load(self._path)
+        except Exception as e:
+            # The signature is not recorded, so the next poll retries the same file
+            log.error(f"Reload of {self._path} failed, keeping current model: {e}")
+            return False
+        self._signature = signature
+        log.info(f"Hot-reloaded model version {version}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self.check()
+
+    def start(self) -> "ModelWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from src.config import ARCHIVE_DIR, RETENTION_CHUNK_SIZE, RETENTION_DAYS
+from src.logger import get_logger
+from src.metrics import ARCHIVED_ROWS
+
+log = get_logger("retention")
+
+
+def archive_path(archive_dir, created_at: str) -> Path:
+    year, month, day = created_at[:10].split("-")
+    name = f"predictions-{year}-{month}-{day}.ndjson.gz"
+    return Path(archive_dir) / "predictions" / year / month / name
+
+
+def _append(path: Path, rows: list) -> None:
+    os.makedirs(path.parent, exist_ok=True)
+    # Appending to a gzip file adds a new member; gzip readers see one continuous stream
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as f:
+            for row in rows:
+                f.write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_expired(
+    db,
+    retention_days: int = RETENTION_DAYS,
+    archive_dir=ARCHIVE_DIR,
+    chunk_size: int = RETENTION_CHUNK_SIZE,
+    pause: float = 0.0,
+    now: datetime | None = None,
+) -> int:
+    if retention_days <= 0:
+        log.info("Retention disabled (RETENTION_DAYS=0)")
+        return 0
+
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    db.flush()
+    archived = 0
+    while True:
+        rows = db.expired_predictions(cutoff, chunk_size)
+        if not rows:
+            break
+
+        partitions = {}
+        for row in rows:
+            partitions.setdefault(archive_path(archive_dir, row["created_at"]), []).append(row)
+        # Rows are only deleted once they are durably archived; a crash in between
+        # means the next run archives them again rather than losing them
+        for path, partition in partitions.items():
+            _append(path, partition)
+        db.delete_predictions(cutoff, rows[0]["id"], rows[-1]["id"])
+
+        archived += len(rows)
+        ARCHIVED_ROWS.inc(len(rows))
+        db.incremental_vacuum(chunk_size)
+        if pause:
+            time.sleep(pause)
+
+    # Minute and hour rollups grow by a row per bucket, label and outcome forever
+    pruned = db.prune_rollups(cutoff)
+    if not db.incremental_vacuum():
+        log.warning("auto_vacuum is not INCREMENTAL; run with --vacuum once to reclaim space")
+    log.info(
+        f"Archived {archived} predictions and pruned {pruned} rollup rows older than "
+        f"{cutoff:%Y-%m-%d %H:%M:%S}"
+    )
+    return archived
+
+
+def read_archive(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
@@ -0,0 +1,116 @@
+import json
+from collections import deque
+from typing import NamedTuple
+
+from src.logger import get_logger
+
+log = get_logger("rules")
+
+# Turkish-aware folding: "İ".lower() is "i" + a combining dot and "I" should match both
+# "ı" and "i", so every i variant folds to a plain "i" before lowercasing
+_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+
+def fold(text: str) -> str:
+    return " ".join(text.translate(_FOLD).lower().split())
+
+
+class RuleMatch(NamedTuple):
+    action: str
+    label: str
+    term: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.action}:{self.term}"
+
+
+class Matcher:
+    # Aho-Corasick automaton: one pass over the text finds every term, however many there
+    # are. Terms match whole words; a trailing "*" makes a term match as a word prefix
+    def __init__(self, terms: dict[str, RuleMatch]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for term, rule in terms.items():
+            prefix = term.endswith("*")
+            key = fold(term.rstrip("*"))
+            if not key:
+                continue
+            state = 0
+            for char in key:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(key), prefix, rule))
+        self._link()
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> list[RuleMatch]:
+        goto, fail, out = self._goto, self._fail, self._out
+        matches, state = [], 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, prefix, rule in out[state]:
+                start = end - length
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if not prefix and end < len(text) and text[end].isalnum():
+                    continue
+                matches.append(rule)
+        return matches
+
+
+class RuleEngine:
+    # Block terms are decisive wherever they occur. Allow entries are whole known-clean
+    # titles: a brand word inside a longer text must not let the rest of it through, so
+    # only an exact (folded) match is decisive and everything else goes to the model
+    def __init__(self, block: dict[str, list[str]] | None = None, allow: list[str] | None = None):
+        terms = {}
+        for label, label_terms in (block or {}).items():
+            for term in label_terms:
+                terms[term] = RuleMatch("block", label, fold(term))
+        self._allow = {fold(title) for title in allow or []} - {""}
+        self.size = len(terms) + len(self._allow)
+        self._matcher = Matcher(terms)
+
+    def match(self, text: str) -> RuleMatch | None:
+        folded = fold(text)
+        matches = self._matcher.find(folded)
+        if matches:
+            return matches[0]
+        if folded in self._allow:
+            return RuleMatch("allow", "product", folded)
+        return None
+
+
+def load_rules(path) -> RuleEngine | None:
+    # {"block": {"<label>": ["term", "prefix*", ...]}, "allow": ["full title", ...]}
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    block, allow = config.get("block", {}), config.get("allow", [])
+    if not isinstance(block, dict) or not isinstance(allow, list):
+        raise ValueError(f"Invalid rules file {path}: expected block mapping and allow list")
+    engine = RuleEngine(block, allow)
+    log.info(f"Loaded {engine.size} rule terms from {path}")
+    return engine
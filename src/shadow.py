@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.cache import PredictionCache
+from src.classifier import TextClassifier
+from src.config import CANARY_PERCENT, SHADOW_MAX_PENDING, SHADOW_SAMPLE_RATE, SHADOW_WORKERS
+from src.logger import get_logger
+from src.metrics import SHADOW_COMPARISONS, SHADOW_LATENCY, SHADOW_SKIPPED
+from src.tracing import endpoint
+
+log = get_logger("shadow")
+
+
+class ShadowRouter:
+    # Serves from the primary classifier, routes CANARY_PERCENT of items to the candidate
+    # and re-scores a SHADOW_SAMPLE_RATE sample with the candidate off the request path
+    def __init__(
+        self,
+        primary: TextClassifier,
+        db=None,
+        sample_rate: float = SHADOW_SAMPLE_RATE,
+        canary_percent: float = CANARY_PERCENT,
+        max_pending: int = SHADOW_MAX_PENDING,
+    ):
+        self.primary = primary
+        self.candidate = None
+        self.sample_rate = sample_rate
+        self.canary_percent = canary_percent
+        self._db = db
+        self._max_pending = max_pending
+        self._pending = 0
+        # Guards _pending and is notified when the last pending comparison finishes
+        self._idle = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=SHADOW_WORKERS, thread_name_prefix="shadow")
+
+    def set_candidate(
+        self, model_path, sample_rate: float | None = None, canary_percent: float | None = None
+    ) -> str:
+        candidate = TextClassifier(model_path, cache=PredictionCache(), rules=self.primary.rules)
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if canary_percent is not None:
+            self.canary_percent = canary_percent
+        self.candidate = candidate
+        log.info(
+            f"Candidate {candidate.version}: shadow {self.sample_rate:.0%}, "
+            f"canary {self.canary_percent}%"
+        )
+        return candidate.version
+
+    def clear_candidate(self) -> None:
+        self.candidate = None
+
+    def status(self) -> dict:
+        candidate = self.candidate
+        return {
+            "primary_version": self.primary.version,
+            "candidate_version": candidate.version if candidate else None,
+            "sample_rate": self.sample_rate,
+            "canary_percent": self.canary_percent,
+        }
+
+    def get_detail(self, text: str) -> dict:
+        return self.get_detail_batch([text])[0]
+
+    def get_detail_batch(self, texts: list[str]) -> list[dict]:
+        candidate = self.candidate
+        if candidate is None:
+            return self.primary.get_detail_batch(texts)
+
+        canary = {i for i in range(len(texts)) if random.random() * 100 < self.canary_percent}
+        served = [i for i in range(len(texts)) if i not in canary]
+        details = [None] * len(texts)
+        for group, clf in ((sorted(canary), candidate), (served, self.primary)):
+            if group:
+                for i, detail in zip(group, clf.get_detail_batch([texts[i] for i in group])):
+                    details[i] = detail
+
+        # Items the canary already served, or a rule decided, are not shadow-scored
+        sampled = [
+            i
+            for i in served
+            if details[i].get("rule") is None and random.random() < self.sample_rate
+        ]
+        if sampled:
+            self._submit(candidate, [texts[i] for i in sampled], [details[i] for i in sampled])
+        return details
+
+    def _submit(self, candidate, texts, details) -> None:
+        with self._idle:
+            if self._pending >= self._max_pending:
+                SHADOW_SKIPPED.inc(len(texts))
+                return
+            self._pending += 1
+        self._executor.submit(self._compare, candidate, texts, details)
+
+    def _compare(self, candidate, texts, details) -> None:
+        try:
+            start = time.perf_counter()
+            with endpoint("shadow"):
+                shadow = candidate.get_detail_batch(texts)
+            latency = (time.perf_counter() - start) / len(texts)
+
+            rows = []
+            for primary, other in zip(details, shadow):
+                agree = primary["label"] == other["label"]
+                SHADOW_COMPARISONS.labels(label=primary["label"], agree=str(agree)).inc()
+                SHADOW_LATENCY.labels(label=primary["label"]).observe(latency)
+                rows.append(
+                    (
+                        primary["model_version"],
+                        other["model_version"],
+                        primary["label"],
+                        other["label"],
+                        agree,
+                        primary["confidence"],
+                        other["confidence"],
+                        latency * 1000,
+                    )
+                )
+            if self._db is not None:
+                self._db.save_shadow_many(rows)
+        except Exception as e:
+            log.error(f"Shadow scoring failed: {e}")
+        finally:
+            with self._idle:
+                self._pending -= 1
+                if not self._pending:
+                    self._idle.notify_all()
+
+    def drain(self, timeout: float | None = None) -> bool:
+        # Waits until every submitted comparison has finished (or timeout); False on timeout
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
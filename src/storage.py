@@ -0,0 +1,354 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from src.config import DB_BACKEND, DB_PATH, DB_POOL_SIZE, DB_URL
+from src.logger import get_logger
+
+log = get_logger("storage")
+
+SQLITE_PRAGMAS = [
+    # Only takes effect on a new database; existing ones need a one-time VACUUM
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+]
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+SQLITE_MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT,
+            label TEXT,
+            confidence REAL,
+            allowed INTEGER,
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT,
+            predicted_label TEXT,
+            correct_label TEXT,
+            created_at TEXT DEFAULT (datetime('now'))
+        )
+        """,
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_label_allowed ON predictions (label, allowed)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_created_at ON feedback (created_at)",
+        """
+        CREATE TABLE IF NOT EXISTS prediction_counts (
+            label TEXT NOT NULL,
+            allowed INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (label, allowed)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO prediction_counts (label, allowed, count)
+        SELECT label, allowed, COUNT(*) FROM predictions
+        WHERE label IS NOT NULL GROUP BY label, allowed
+        """,
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS prediction_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            label TEXT NOT NULL,
+            allowed INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (granularity, bucket, label, allowed)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO prediction_rollups (granularity, bucket, label, allowed, count)
+        SELECT 'minute', substr(created_at, 1, 16) || ':00', label, allowed, COUNT(*)
+        FROM predictions WHERE label IS NOT NULL GROUP BY 2, label, allowed
+        """,
+        """
+        INSERT INTO prediction_rollups (granularity, bucket, label, allowed, count)
+        SELECT 'hour', substr(created_at, 1, 13) || ':00:00', label, allowed, COUNT(*)
+        FROM predictions WHERE label IS NOT NULL GROUP BY 2, label, allowed
+        """,
+        """
+        INSERT INTO prediction_rollups (granularity, bucket, label, allowed, count)
+        SELECT 'day', substr(created_at, 1, 10) || ' 00:00:00', label, allowed, COUNT(*)
+        FROM predictions WHERE label IS NOT NULL GROUP BY 2, label, allowed
+        """,
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS idx_predictions_label_id ON predictions (label, id)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_allowed_id ON predictions (allowed, id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_predicted_id ON feedback (predicted_label, id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_correct_id ON feedback (correct_label, id)",
+    ],
+    [
+        "ALTER TABLE predictions ADD COLUMN model_version TEXT",
+        "ALTER TABLE feedback ADD COLUMN model_version TEXT",
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS shadow_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            primary_version TEXT,
+            candidate_version TEXT,
+            primary_label TEXT,
+            candidate_label TEXT,
+            agree INTEGER,
+            primary_confidence REAL,
+            candidate_confidence REAL,
+            latency_ms REAL,
+            created_at TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_shadow_candidate ON shadow_results "
+        "(candidate_version, primary_label)",
+    ],
+]
+
+# Postgres keeps created_at as UTC text in the same format as SQLite so queries,
+# rollup buckets and API responses are identical across backends
+POSTGRES_MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id BIGSERIAL PRIMARY KEY,
+            text TEXT,
+            label TEXT,
+            confidence DOUBLE PRECISION,
+            allowed INTEGER,
+            created_at TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS')
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id BIGSERIAL PRIMARY KEY,
+            text TEXT,
+            predicted_label TEXT,
+            correct_label TEXT,
+            created_at TEXT DEFAULT to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS')
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_label_allowed ON predictions (label, allowed)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_label_id ON predictions (label, id)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_allowed_id ON predictions (allowed, id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_created_at ON feedback (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_predicted_id ON feedback (predicted_label, id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_correct_id ON feedback (correct_label, id)",
+        """
+        CREATE TABLE IF NOT EXISTS prediction_counts (
+            label TEXT NOT NULL,
+            allowed INTEGER NOT NULL,
+            count BIGINT NOT NULL,
+            PRIMARY KEY (label, allowed)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS prediction_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            label TEXT NOT NULL,
+            allowed INTEGER NOT NULL,
+            count BIGINT NOT NULL,
+            PRIMARY KEY (granularity, bucket, label, allowed)
+        )
+        """,
+    ],
+    [
+        "ALTER TABLE predictions ADD COLUMN IF NOT EXISTS model_version TEXT",
+        "ALTER TABLE feedback ADD COLUMN IF NOT EXISTS model_version TEXT",
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS shadow_results (
+            id BIGSERIAL PRIMARY KEY,
+            primary_version TEXT,
+            candidate_version TEXT,
+            primary_label TEXT,
+            candidate_label TEXT,
+            agree INTEGER,
+            primary_confidence DOUBLE PRECISION,
+            candidate_confidence DOUBLE PRECISION,
+            latency_ms DOUBLE PRECISION,
+            created_at TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_shadow_candidate ON shadow_results "
+        "(candidate_version, primary_label)",
+    ],
+]
+
+
+class SQLiteStorage:
+    # Bounded pool of up to pool_size connections shared by all threads. Threadpool
+    # workers come and go, so per-thread connections (each with its own page cache and
+    # mmap) would pile up. WAL lets readers run alongside the single writer and
+    # busy_timeout serializes writers from other worker processes
+    def __init__(self, path=None, pool_size: int = DB_POOL_SIZE):
+        self.path = str(path or DB_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._pool_size = max(1, pool_size)
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.migrate()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                conn = None
+                if len(self._connections) < self._pool_size:
+                    conn = self._open()
+                    self._connections.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self._connection() as conn:
+            with conn:
+                yield conn.cursor()
+
+    def query(self, sql, params=()) -> list:
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def migrate(self) -> None:
+        with self._connection() as conn:
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        for target, statements in enumerate(SQLITE_MIGRATIONS, start=1):
+            # IMMEDIATE takes the write lock up front so concurrent workers migrate once
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                    conn.rollback()
+                    continue
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            log.info(f"Database schema migrated to version {target}")
+
+    def reclaim(self, pages: int = 0) -> bool:
+        # Returns False when the database was created without auto_vacuum = INCREMENTAL
+        with self._connection() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return False
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return True
+
+    def vacuum(self) -> None:
+        with self._connection() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._idle = queue.LifoQueue()
+
+
+class _PostgresCursor:
+    # Lets PredictionDB keep writing sqlite-style "?" placeholders
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("?", "%s"), params)
+        return self._cursor
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(sql.replace("?", "%s"), list(rows))
+        return self._cursor
+
+
+class PostgresStorage:
+    # Connection pool shared by all threads; any number of worker processes can write
+    def __init__(self, url=DB_URL, pool_size: int = DB_POOL_SIZE):
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImportError(
+                "The postgres backend needs psycopg: pip install 'psycopg[binary,pool]'"
+            ) from e
+        if not url:
+            raise ValueError("DB_URL must be set for the postgres backend")
+        self._pool = ConnectionPool(url, min_size=1, max_size=pool_size, open=True)
+        self.migrate()
+
+    @contextmanager
+    def transaction(self):
+        with self._pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    yield _PostgresCursor(cur)
+
+    def query(self, sql, params=()) -> list:
+        with self._pool.connection() as conn:
+            return conn.execute(sql.replace("?", "%s"), params).fetchall()
+
+    def migrate(self) -> None:
+        with self.transaction() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(7011)")
+            cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+            row = cur.execute("SELECT MAX(version) FROM schema_version").fetchone()
+            version = row[0] or 0
+            for target, statements in enumerate(POSTGRES_MIGRATIONS[version:], start=version + 1):
+                for sql in statements:
+                    cur.execute(sql)
+                cur.execute("INSERT INTO schema_version (version) VALUES (?)", (target,))
+                log.info(f"Database schema migrated to version {target}")
+
+    def reclaim(self, pages: int = 0) -> bool:
+        # Autovacuum reclaims space from deleted rows
+        return True
+
+    def vacuum(self) -> None:
+        with self._pool.connection() as conn:
+            conn.autocommit = True
+            conn.execute("VACUUM ANALYZE predictions")
+            conn.autocommit = False
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def create_storage(backend: str = DB_BACKEND, db_path=None):
+    if backend == "sqlite":
+        return SQLiteStorage(db_path)
+    if backend == "postgres":
+        return PostgresStorage()
+    raise ValueError(f"Unknown DB_BACKEND: {backend}")
@@ -0,0 +1,72 @@
+import contextvars
+import json
+import random
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from src.config import TRACE_SAMPLE_RATE
+from src.logger import get_logger
+from src.metrics import STAGE_LATENCY
+
+log = get_logger("trace")
+
+# Endpoint label for spans and, for sampled requests, the list collecting them. Both live
+# in contextvars, so run blocking work through bind() to keep them in executor threads.
+_endpoint = contextvars.ContextVar("endpoint", default="background")
+_spans = contextvars.ContextVar("spans", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(endpoint=_endpoint.get(), stage=stage).observe(elapsed)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+@contextmanager
+def endpoint(name: str):
+    # Label spans of work that is not tied to one request (batches, shadow scoring)
+    token = _endpoint.set(name)
+    try:
+        yield
+    finally:
+        _endpoint.reset(token)
+
+
+@contextmanager
+def traced(name: str, sample_rate: float | None = None):
+    # One request: spans are labelled with the endpoint, the whole block is the "total"
+    # stage, and a sample of requests is written to the trace log span by span
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    spans = [] if rate > 0 and random.random() < rate else None
+    endpoint_token, spans_token = _endpoint.set(name), _spans.set(spans)
+    try:
+        with span("total"):
+            yield
+    finally:
+        _spans.reset(spans_token)
+        _endpoint.reset(endpoint_token)
+        if spans:
+            *stages, (_, total) = spans
+            log.info(
+                "Trace "
+                + json.dumps(
+                    {
+                        "endpoint": name,
+                        "total_ms": round(total * 1000, 3),
+                        "spans": [{"stage": s, "ms": round(t * 1000, 3)} for s, t in stages],
+                    }
+                )
+            )
+
+
+def bind(fn, *args, **kwargs):
+    # Run fn later, possibly in another thread, inside a copy of the current context
+    return partial(contextvars.copy_context().run, fn, *args, **kwargs)
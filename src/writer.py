@@ -0,0 +1,164 @@
+import atexit
+import queue
+import threading
+import time
+import weakref
+
+from src.config import (
+    DB_FLUSH_INTERVAL,
+    DB_FLUSH_ROWS,
+    DB_FLUSH_TIMEOUT,
+    DB_QUEUE_SIZE,
+    DB_QUEUE_TIMEOUT,
+)
+from src.logger import get_logger
+from src.metrics import DB_FLUSH_SIZE, DB_QUEUE_DEPTH, DB_WRITES_DROPPED
+
+log = get_logger("writer")
+
+# Open writers, closed (and drained) at interpreter exit without atexit pinning them
+_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_all() -> None:
+    for writer in list(_writers):
+        writer.close()
+
+
+class WriteBehindWriter:
+    # sink receives {kind: [row, ...]} and must persist all rows in one transaction
+    def __init__(
+        self,
+        sink,
+        flush_interval: float = DB_FLUSH_INTERVAL,
+        flush_rows: int = DB_FLUSH_ROWS,
+        max_queue: int = DB_QUEUE_SIZE,
+        put_timeout: float = DB_QUEUE_TIMEOUT,
+        flush_timeout: float = DB_FLUSH_TIMEOUT,
+    ):
+        self._sink = sink
+        self._flush_interval = flush_interval
+        self._flush_rows = max(1, flush_rows)
+        self._put_timeout = put_timeout
+        self._flush_timeout = flush_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Rows accepted by put() and rows the writer has finished with; flush() waits for
+        # the second to catch up with the first as it was when flush() was called
+        self._accepted = 0
+        self._processed = 0
+        self._progress = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        _writers.add(self)
+
+    def put(self, kind: str, row: tuple, block: bool = True) -> bool:
+        # block=False never waits, for callers on the event loop
+        try:
+            if block and self._put_timeout > 0:
+                self._queue.put((kind, row), timeout=self._put_timeout)
+            else:
+                self._queue.put_nowait((kind, row))
+        except queue.Full:
+            DB_WRITES_DROPPED.labels(kind=kind).inc()
+            return False
+        with self._progress:
+            self._accepted += 1
+        DB_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def _drain(self, first=None, deadline: float = None) -> list:
+        # Collects rows until flush_rows or the deadline; None in the queue (from flush()
+        # or close()) cuts the batch short. Without a deadline only takes what is queued
+        items = [first] if first is not None else []
+        while len(items) < self._flush_rows:
+            remaining = deadline - time.monotonic() if deadline is not None else 0
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.task_done()
+                if deadline is not None:
+                    break
+                continue
+            items.append(item)
+        return items
+
+    def _write(self, items: list) -> None:
+        grouped = {}
+        for kind, row in items:
+            grouped.setdefault(kind, []).append(row)
+        try:
+            self._sink(grouped)
+            DB_FLUSH_SIZE.observe(len(items))
+        except Exception as e:
+            log.error(f"Failed to flush {len(items)} rows: {e}")
+            for kind, rows in grouped.items():
+                DB_WRITES_DROPPED.labels(kind=kind).inc(len(rows))
+        finally:
+            for _ in items:
+                self._queue.task_done()
+            DB_QUEUE_DEPTH.set(self._queue.qsize())
+            with self._progress:
+                self._processed += len(items)
+                self._progress.notify_all()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                self._queue.task_done()
+                continue
+            # One transaction per flush interval (or flush_rows) rather than per row
+            self._write(self._drain(first, time.monotonic() + self._flush_interval))
+
+    def flush(self) -> bool:
+        # Read-your-writes: waits for the rows accepted before this call, which are ahead
+        # of anything enqueued later in the FIFO, so sustained write traffic cannot keep
+        # a read waiting and the rows are still written by the background thread.
+        # Gives up after flush_timeout so a stuck sink cannot block readers forever
+        if not self._thread.is_alive():
+            self._write_pending()
+            return True
+        with self._progress:
+            target = self._accepted
+            if self._processed >= target:
+                return True
+        try:
+            # Ends the batch being collected instead of waiting out the flush interval
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        with self._progress:
+            done = self._progress.wait_for(
+                lambda: self._processed >= target, timeout=self._flush_timeout
+            )
+        if not done:
+            log.warning(f"Write-behind flush timed out after {self._flush_timeout}s")
+        return done
+
+    def _write_pending(self) -> None:
+        while True:
+            items = self._drain()
+            if not items:
+                break
+            self._write(items)
+
+    def close(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join()
+        self._write_pending()
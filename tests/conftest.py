@@ -1,34 +1,60 @@
+import json
 import os
-import pytest
+import shutil
+import tempfile
+
 import joblib
+import pytest
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import SGDClassifier
 from sklearn.pipeline import Pipeline
 
+# Fresh rate limit buckets for every run instead of the shared data/ratelimit.db
+os.environ.setdefault(
+    "RATE_LIMIT_PATH", os.path.join(tempfile.mkdtemp(prefix="ratelimit-"), "ratelimit.db")
+)
+
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+MODEL_PATH = os.path.join(MODEL_DIR, "classifier.pkl")
+
 
 @pytest.fixture(scope="session", autouse=True)
 def ensure_model():
-    model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
-    model_path = os.path.join(model_dir, "classifier.pkl")
+    model_dir, model_path = MODEL_DIR, MODEL_PATH
 
     if os.path.isfile(model_path):
         yield
         return
 
     texts = [
-        "Samsung Galaxy S24", "Nike Air Max", "Apple MacBook",
-        "iPhone 15 Pro", "Sony Headphones", "Laptop Dell",
-        "vibrator massager", "adult toy item", "lingerie set",
-        "dildo silicone", "bondage kit", "sexy costume",
-        "fuck you idiot", "go to hell moron", "piece of shit",
-        "kill yourself", "scam fraud money", "hate speech text",
+        "Samsung Galaxy S24",
+        "Nike Air Max",
+        "Apple MacBook",
+        "iPhone 15 Pro",
+        "Sony Headphones",
+        "Laptop Dell",
+        "vibrator massager",
+        "adult toy item",
+        "lingerie set",
+        "dildo silicone",
+        "bondage kit",
+        "sexy costume",
+        "fuck you idiot",
+        "go to hell moron",
+        "piece of shit",
+        "kill yourself",
+        "scam fraud money",
+        "hate speech text",
     ]
     labels = ["product"] * 6 + ["adult"] * 6 + ["toxic"] * 6
 
-    pipeline = Pipeline([
-        ("tfidf", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), max_features=5000)),
-        ("clf", SGDClassifier(loss="modified_huber", max_iter=200, random_state=42)),
-    ])
+    pipeline = Pipeline(
+        [
+            ("tfidf", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), max_features=5000)),
+            ("clf", SGDClassifier(loss="modified_huber", max_iter=200, random_state=42)),
+        ]
+    )
     pipeline.fit(texts, labels)
 
     os.makedirs(model_dir, exist_ok=True)
@@ -37,3 +63,22 @@ def ensure_model():
     yield
 
     os.remove(model_path)
+
+
+@pytest.fixture
+def model_path():
+    return MODEL_PATH
+
+
+@pytest.fixture
+def add_model_version(tmp_path):
+    # Copies the test model into tmp_path as classifier_<version>.pkl with a .json sidecar
+    def add(version, **metadata):
+        path = tmp_path / f"classifier_{version}.pkl"
+        shutil.copy2(MODEL_PATH, path)
+        (tmp_path / f"classifier_{version}.json").write_text(
+            json.dumps({"version": version, **metadata})
+        )
+        return path
+
+    return add
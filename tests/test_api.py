@@ -1,4 +1,7 @@
+import json
+
 from fastapi.testclient import TestClient
+
 from api import app
 
 client = TestClient(app)
@@ -24,6 +27,7 @@ def test_predict():
     assert "allowed" in data
     assert "needs_review" in data
     assert isinstance(data["needs_review"], bool)
+    assert "rule" in data
 
 
 def test_predict_response_types():
@@ -88,6 +92,15 @@ def test_explain():
     assert "top_features" in data
 
 
+def test_explain_batch():
+    texts = ["Samsung Galaxy S24", "go to hell moron"]
+    r = client.post("/predict/explain/batch", json={"texts": texts, "top_n": 3})
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data) == 2
+    assert all(len(d["top_features"]) <= 3 for d in data)
+
+
 def test_explain_empty_text():
     r = client.post("/predict/explain", json={"text": ""})
     assert r.status_code == 422
@@ -124,3 +137,338 @@ def test_metrics():
     body = r.text
     assert "prediction_total" in body
     assert "prediction_latency_seconds" in body
+
+
+def test_stats_timeseries():
+    client.post("/predict", json={"text": "test for timeseries"})
+    r = client.get("/stats/timeseries?granularity=minute")
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data) >= 1
+    assert data[-1]["total"] >= 1
+    assert data[-1]["total"] == data[-1]["allowed"] + data[-1]["blocked"]
+
+
+def test_stats_timeseries_invalid():
+    assert client.get("/stats/timeseries?granularity=week").status_code == 400
+    assert client.get("/stats/timeseries?from=2026-01-02&to=2026-01-01").status_code == 400
+    r = client.get("/stats/timeseries?from=2000-01-01&to=2026-01-01&granularity=minute")
+    assert r.status_code == 400
+
+
+def test_history_cursor():
+    for i in range(3):
+        client.post("/predict", json={"text": f"cursor test {i}"})
+    r = client.get("/history?limit=2")
+    first = r.json()
+    cursor = r.headers["X-Next-Cursor"]
+    assert cursor == str(first[-1]["id"])
+    second = client.get(f"/history?limit=2&cursor={cursor}").json()
+    assert all(row["id"] < first[-1]["id"] for row in second)
+
+
+def test_history_filters():
+    client.post("/predict", json={"text": "fuck you idiot"})
+    r = client.get("/history?allowed=false&min_confidence=0&max_confidence=1")
+    assert r.status_code == 200
+    assert all(row["allowed"] is False for row in r.json())
+
+
+def test_history_export():
+    client.post("/predict", json={"text": "test for export"})
+    r = client.get("/history/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) >= 1
+    assert "label" in rows[0]
+
+
+def test_feedback_export():
+    client.post("/feedback", json={"text": "export item", "correct_label": "adult"})
+    r = client.get("/feedback/export?correct_label=adult")
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert rows and all(row["correct_label"] == "adult" for row in rows)
+
+
+def test_predict_reports_model_version():
+    r = client.post("/predict", json={"text": "Samsung Galaxy S24"})
+    assert r.json()["model_version"] == client.get("/health").json()["model_version"]
+
+
+def test_admin_models():
+    r = client.get("/admin/models")
+    assert r.status_code == 200
+    data = r.json()
+    assert "current" in data
+    assert isinstance(data["versions"], list)
+
+
+def test_admin_load_unknown_model():
+    r = client.post("/admin/models/20990101_000000/load")
+    assert r.status_code == 404
+
+
+def test_admin_load_latest_model():
+    r = client.post("/admin/models/latest/load")
+    assert r.status_code == 200
+    assert r.json()["current"] == client.get("/health").json()["model_version"]
+
+
+def test_admin_shadow():
+    r = client.post("/admin/shadow", json={"version": "latest", "sample_rate": 1.0})
+    assert r.status_code == 200
+    candidate = r.json()["candidate_version"]
+    assert candidate is not None
+
+    client.post("/predict/batch", json={"texts": ["Samsung Galaxy", "go to hell moron"]})
+    from api import router
+
+    router.drain()
+    data = client.get("/admin/shadow").json()
+    assert sum(s["total"] for s in data["results"][candidate].values()) >= 2
+
+    r = client.delete("/admin/shadow")
+    assert r.json()["candidate_version"] is None
+
+
+def test_admin_shadow_unknown_model():
+    r = client.post("/admin/shadow", json={"version": "20990101_000000"})
+    assert r.status_code == 404
+
+
+def test_predict_stream_ndjson():
+    lines = [
+        json.dumps({"text": "Samsung Galaxy S24", "id": "a1"}),
+        "",
+        json.dumps("go to hell moron"),
+        "not json",
+        json.dumps({"title": "missing text"}),
+    ]
+    r = client.post(
+        "/predict/stream",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["line"] for row in rows] == [1, 3, 4, 5]
+    assert rows[0]["id"] == "a1" and "label" in rows[0]
+    assert "label" in rows[1]
+    assert "error" in rows[2] and "error" in rows[3]
+
+
+def test_predict_stream_plain_text_chunked():
+    def body():
+        for i in range(1200):
+            yield f"Nike Air Max {i}\n".encode()
+
+    r = client.post("/predict/stream", content=body(), headers={"Content-Type": "text/plain"})
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 1200
+    assert rows[-1]["line"] == 1200
+    assert all("label" in row for row in rows)
+
+
+def test_predict_stream_waits_for_admission(monkeypatch):
+    from api import admission
+    from src.admission import Overloaded
+
+    acquire, calls = admission.acquire, []
+
+    async def saturated(priority):
+        calls.append(priority)
+        if len(calls) <= 2:
+            raise Overloaded(1)
+        await acquire(priority)
+
+    monkeypatch.setattr(admission, "acquire", saturated)
+    r = client.post(
+        "/predict/stream",
+        content=b"Nike Air Max\nSamsung Galaxy\n",
+        headers={"Content-Type": "text/plain"},
+    )
+    assert r.status_code == 200
+    assert all("label" in json.loads(line) for line in r.text.splitlines())
+    assert calls == [2, 2, 2]
+
+
+def test_predict_stream_gives_up_after_max_wait(monkeypatch):
+    import api
+    from src.admission import Overloaded
+
+    calls = []
+
+    async def overloaded(priority):
+        calls.append(priority)
+        raise Overloaded(2)
+
+    monkeypatch.setattr(api.admission, "acquire", overloaded)
+    monkeypatch.setattr(api.admission, "queue_timeout", 0)
+    monkeypatch.setattr(api, "STREAM_MAX_WAIT", 0.1)
+    r = client.post(
+        "/predict/stream", content=b"Nike Air Max\n", headers={"Content-Type": "text/plain"}
+    )
+    assert r.status_code == 200
+    assert [json.loads(line) for line in r.text.splitlines()] == [
+        {"error": "Server overloaded", "retry_after": 2}
+    ]
+    # Backs off from a 10ms floor instead of spinning with a zero queue timeout
+    assert 1 < len(calls) < 10
+
+
+def test_stream_inference_stops_retrying_when_client_disconnects(monkeypatch):
+    import asyncio
+
+    import pytest
+
+    import api
+    from src.admission import Overloaded
+
+    calls = []
+
+    async def overloaded(priority):
+        calls.append(priority)
+        raise Overloaded(1)
+
+    class Gone:
+        async def is_disconnected(self):
+            return True
+
+    monkeypatch.setattr(api.admission, "acquire", overloaded)
+    with pytest.raises(Overloaded):
+        asyncio.run(api._stream_inference(Gone(), ["Nike Air Max"]))
+    assert calls == [2]
+
+
+def test_duplex_request_keeps_body_seen_by_disconnect_check():
+    import asyncio
+
+    from fastapi import Request
+
+    from api import DuplexRequest
+
+    async def run():
+        messages = [
+            {"type": "http.request", "body": b"a\n", "more_body": True},
+            {"type": "http.request", "body": b"b\n", "more_body": False},
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        request = DuplexRequest(Request({"type": "http", "method": "POST"}, receive))
+        assert await request.is_disconnected() is False
+        return b"".join([chunk async for chunk in request.stream()])
+
+    assert asyncio.run(run()) == b"a\nb\n"
+
+
+def test_predict_stream_saves_with_blocking_put_off_event_loop(monkeypatch):
+    import asyncio
+
+    from api import db
+
+    calls = []
+
+    def save_many(predictions, block=True):
+        try:
+            asyncio.get_running_loop()
+            on_loop = True
+        except RuntimeError:
+            on_loop = False
+        calls.append((len(list(predictions)), block, on_loop))
+
+    monkeypatch.setattr(db, "save_many", save_many)
+    r = client.post(
+        "/predict/stream",
+        content=b"Nike Air Max\nSamsung Galaxy\n",
+        headers={"Content-Type": "text/plain"},
+    )
+    assert r.status_code == 200
+    assert calls == [(2, True, False)]
+
+
+def test_blocking_rate_limit_store_runs_off_event_loop(monkeypatch):
+    import asyncio
+
+    from api import limiter
+
+    loops = []
+
+    class BlockingStore:
+        blocking = True
+
+        def take(self, key, capacity, rate, cost=1):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return True, capacity
+
+    monkeypatch.setattr(limiter, "store", BlockingStore())
+    assert client.post("/predict", json={"text": "Samsung Galaxy"}).status_code == 200
+    assert loops == [None]
+
+
+def test_health_responsive_with_saturated_inference():
+    import threading
+
+    from src.executor import inference_executor
+
+    release = threading.Event()
+    blockers = [
+        inference_executor.submit(release.wait, 10) for _ in range(inference_executor._max_workers)
+    ]
+    try:
+        assert client.get("/health").status_code == 200
+        assert client.get("/stats").status_code == 200
+        assert client.get("/metrics").status_code == 200
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result()
+
+
+def test_overloaded_returns_503(monkeypatch):
+    from api import admission
+    from src.admission import Overloaded
+
+    async def reject(priority):
+        raise Overloaded(3)
+
+    monkeypatch.setattr(admission, "acquire", reject)
+    r = client.post("/predict", json={"text": "Samsung Galaxy"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "3"
+    assert r.json() == {"error": "Server overloaded"}
+
+
+def test_rate_limited_returns_429(monkeypatch):
+    from api import limiter
+    from src.ratelimit import MemoryBucketStore
+
+    monkeypatch.setattr(limiter, "store", MemoryBucketStore())
+    monkeypatch.setattr(limiter, "ip_limit", (1, 1 / 60))
+    assert client.post("/predict", json={"text": "Samsung Galaxy"}).status_code == 200
+    r = client.post("/predict", json={"text": "Samsung Galaxy"})
+    assert r.status_code == 429
+    assert r.json() == {"error": "Too many requests"}
+    assert r.headers["Retry-After"] == "60"
+
+
+def test_stage_metrics_exported():
+    client.post("/predict/explain", json={"text": "Samsung Galaxy S24"})
+    body = client.get("/metrics").text
+    assert 'stage_latency_seconds_count{endpoint="explain",stage="total"}' in body
+    assert 'stage_latency_seconds_count{endpoint="explain",stage="vectorize"}' in body
+
+
+def test_admin_profile():
+    r = client.get("/admin/profile?seconds=0.1&interval_ms=10")
+    assert r.status_code == 200
+    assert r.json()["samples"] > 0
+    r = client.get("/admin/profile?seconds=0.1&format=collapsed")
+    assert r.headers["content-type"].startswith("text/plain")
+    assert client.get("/admin/profile?seconds=3600").status_code == 400
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.batcher import MicroBatcher
+
+
+def test_concurrent_submissions_share_a_batch():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [i * 2 for i in items]
+
+    async def run():
+        batcher = MicroBatcher(fn, max_size=10, max_wait_ms=50)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+
+def test_max_size_splits_batches():
+    calls = []
+
+    def fn(items):
+        calls.append(len(items))
+        return items
+
+    async def run():
+        batcher = MicroBatcher(fn, max_size=2, max_wait_ms=50)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert sorted(calls) == [1, 2, 2]
+
+
+def test_errors_propagate_to_callers():
+    def fn(items):
+        raise ValueError("boom")
+
+    async def run():
+        batcher = MicroBatcher(fn, max_size=4, max_wait_ms=1)
+        return await batcher.submit("x")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_result_count_mismatch_fails_every_caller():
+    async def run():
+        batcher = MicroBatcher(lambda items: items[:1], max_size=4, max_wait_ms=50)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), 5
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_restarts_on_new_event_loop():
+    batcher = MicroBatcher(lambda items: items, max_wait_ms=0)
+    assert asyncio.run(batcher.submit("a")) == "a"
+    assert asyncio.run(batcher.submit("b")) == "b"
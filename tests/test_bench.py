@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+from scripts.bench import build_corpus, compare, summarize
+
+
+def test_corpus_is_unique_and_mixed_length():
+    corpus = build_corpus(500)
+    assert len(set(corpus)) == 500
+    lengths = sorted(len(t.split()) for t in corpus)
+    assert lengths[0] <= 7 and lengths[-1] >= 40
+    assert build_corpus(50) == build_corpus(50)
+
+
+def test_summarize_percentiles():
+    result = summarize([i / 1000 for i in range(1, 101)], items_per_call=10)
+    assert result["iterations"] == 100
+    assert result["p50_ms"] == 50.5
+    assert 95 <= result["p95_ms"] <= 96
+    assert 99 <= result["p99_ms"] <= 100
+    assert result["items_per_sec"] == round(10 * 1000 / 50.5, 1)
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        "results": {
+            "predict": {"p95_ms": 1.0},
+            "explain": {"p95_ms": 1.0},
+            "api_predict_concurrent_8": {"items_per_sec": 1000},
+        }
+    }
+    current = {
+        "results": {
+            "predict": {"p95_ms": 1.5},
+            "explain": {"p95_ms": 1.1},
+            "api_predict_concurrent_8": {"items_per_sec": 500},
+            "new_benchmark": {"p95_ms": 9.0},
+        }
+    }
+    regressions = compare(current, baseline, threshold=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("predict:")
+    assert regressions[1].startswith("api_predict_concurrent_8:")
+
+
+def test_import_leaves_environment_alone():
+    code = (
+        "import os, sys; before = dict(os.environ); import scripts.bench; "
+        "sys.exit(dict(os.environ) != before or 'src.config' in sys.modules)"
+    )
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
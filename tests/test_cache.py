@@ -0,0 +1,54 @@
+import time
+
+from src.cache import PredictionCache
+from src.classifier import TextClassifier
+
+
+def test_get_put():
+    cache = PredictionCache(max_size=10)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_expiry():
+    cache = PredictionCache(max_size=10, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_disabled():
+    cache = PredictionCache(max_size=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_classifier_caches_cleaned_text():
+    cache = PredictionCache(max_size=10)
+    clf = TextClassifier(cache=cache)
+    first = clf.predict("Samsung  Galaxy S24")
+    assert len(cache) == 1
+    assert clf.predict(" Samsung Galaxy S24 ") == first
+    assert len(cache) == 1
+
+
+def test_reload_invalidates_cache():
+    cache = PredictionCache(max_size=10)
+    clf = TextClassifier(cache=cache)
+    clf.predict("Samsung Galaxy S24")
+    clf.load(clf._model_path)
+    assert len(cache) == 0
@@ -1,4 +1,14 @@
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pytest
+
+from scripts.train import build_classifier, build_pipeline, build_vectorizer
+from src.cache import PredictionCache
 from src.classifier import TextClassifier
+from src.engine import export_compact
 
 
 def test_predict_returns_tuple():
@@ -103,3 +113,91 @@ def test_explain_features_list():
     if result["top_features"]:
         assert "feature" in result["top_features"][0]
         assert "weight" in result["top_features"][0]
+
+
+def test_explain_matches_reference():
+    clf = TextClassifier()
+    text = "go to hell moron Samsung Galaxy"
+    result = clf.explain(text, top_n=5)
+
+    X = clf._vectorizer.transform([text])
+    idx = list(clf._estimator.classes_).index(result["label"])
+    names = clf._vectorizer.get_feature_names_out()
+    reference = {
+        names[i]: round(float(X[0, i] * clf._estimator.coef_[idx][i]), 4) for i in X.nonzero()[1]
+    }
+    expected = sorted(reference.values(), key=abs, reverse=True)[:5]
+    # Equal contributions may come back in either order
+    assert [f["weight"] for f in result["top_features"]] == expected
+    assert all(reference[f["feature"]] == f["weight"] for f in result["top_features"])
+
+
+def test_explain_batch():
+    clf = TextClassifier()
+    texts = ["Samsung Galaxy S24", "", "vibrator massager"]
+    results = clf.explain_batch(texts, top_n=3)
+    assert len(results) == 3
+    assert results[1]["top_features"] == []
+    assert results[0] == clf.explain(texts[0], top_n=3)
+    assert all(len(r["top_features"]) <= 3 for r in results)
+
+
+def test_predict_batch_matches_predict():
+    clf = TextClassifier()
+    texts = ["Samsung Galaxy S24", "fuck you idiot", "vibrator massager"]
+    assert clf.predict_batch(texts) == [clf.predict(t) for t in texts]
+
+
+def test_predict_batch_empty_text():
+    clf = TextClassifier()
+    results = clf.predict_batch(["", "Samsung Galaxy"])
+    assert results[0] == ("product", 1.0)
+
+
+def test_get_detail_batch():
+    clf = TextClassifier()
+    texts = ["Samsung Galaxy S24", "fuck you idiot"]
+    assert clf.get_detail_batch(texts) == [clf.get_detail(t) for t in texts]
+
+
+def test_model_arrays_memory_mapped():
+    clf = TextClassifier()
+    assert isinstance(clf._estimator.coef_, np.memmap)
+
+
+def test_hashing_model(tmp_path):
+    texts = [
+        "Samsung Galaxy S24",
+        "Nike Air Max",
+        "dildo silicone",
+        "bondage kit",
+        "fuck you idiot",
+        "go to hell moron",
+    ]
+    labels = ["product", "product", "adult", "adult", "toxic", "toxic"]
+    vectorizer = build_vectorizer("hashing", hash_bits=12)
+    pipeline = build_pipeline(vectorizer, build_classifier(max_iter=200))
+    pipeline.fit(texts, labels)
+    path = tmp_path / "hashing.pkl"
+    joblib.dump(pipeline, path)
+
+    clf = TextClassifier(path, cache=PredictionCache(0))
+    assert clf._vectorizer.transform(["Nike"]).shape == (1, 2**12)
+    assert clf.predict_batch(texts) == [
+        (label, float(np.max(proba)))
+        for label, proba in zip(pipeline.predict(texts), pipeline.predict_proba(texts))
+    ]
+
+    result = clf.explain("go to hell moron", top_n=5)
+    assert len(result["top_features"]) == 5
+    grams = set(vectorizer.steps[0][1].build_analyzer()("go to hell moron"))
+    for feature in result["top_features"]:
+        assert set(feature["feature"].split("|")) <= grams
+
+    with pytest.raises(ValueError):
+        export_compact(pipeline, tmp_path / "hashing.compact")
+
+
+def test_classifier_import_does_not_load_sklearn():
+    code = "import sys, src.classifier; sys.exit('sklearn' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,245 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.database import PredictionDB
+from src.storage import create_storage
+from src.writer import WriteBehindWriter
+
+
+def test_save_and_stats(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    db.save("Samsung Galaxy", "product", 0.99, True)
+    db.save("fuck you", "toxic", 0.97, False)
+    stats = db.get_stats()
+    assert stats["total"] == 2
+    assert stats["blocked"] == 1
+    assert stats["by_label"] == {"product": 1, "toxic": 1}
+
+
+def test_write_behind_reads_see_pending_rows(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=True)
+    db.save_many([("a", "product", 0.9, True), ("b", "adult", 0.8, False)])
+    db.save_feedback("b", "adult", "product")
+    assert len(db.get_recent()) == 2
+    assert db.get_feedback()[0]["correct_label"] == "product"
+    db.close()
+
+
+def test_close_flushes(tmp_path):
+    path = tmp_path / "p.db"
+    db = PredictionDB(path, write_behind=True)
+    db.save("a", "product", 0.9, True)
+    db.close()
+    assert PredictionDB(path, write_behind=False).get_stats()["total"] == 1
+
+
+def test_writer_batches_rows():
+    batches = []
+    writer = WriteBehindWriter(batches.append, flush_interval=10, flush_rows=100)
+    for i in range(5):
+        writer.put("prediction", (i,))
+    writer.flush()
+    writer.close()
+    assert sum(len(b["prediction"]) for b in batches) == 5
+    assert len(batches) <= 2
+
+
+def test_writer_collects_rows_for_flush_interval():
+    batches = []
+    writer = WriteBehindWriter(batches.append, flush_interval=0.3, flush_rows=100)
+    for i in range(3):
+        writer.put("prediction", (i,))
+        time.sleep(0.02)
+    deadline = time.monotonic() + 5
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert [len(b["prediction"]) for b in batches] == [3]
+
+
+def test_writer_flush_times_out_on_stuck_sink():
+    release = threading.Event()
+    writer = WriteBehindWriter(lambda rows: release.wait(), flush_interval=0.01, flush_timeout=0.05)
+    writer.put("prediction", (1,))
+    assert writer.flush() is False
+    release.set()
+    assert writer.flush() is True
+    writer.close()
+
+
+def test_writer_drops_when_full():
+    release = threading.Event()
+    writer = WriteBehindWriter(
+        lambda rows: release.wait(), flush_interval=0.01, max_queue=1, put_timeout=0
+    )
+    writer.put("prediction", (1,))
+    while writer._queue.qsize():
+        time.sleep(0.001)
+    assert writer.put("prediction", (2,)) is True
+    assert writer.put("prediction", (3,)) is False
+    release.set()
+    writer.close()
+
+
+def test_migrates_legacy_database(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT, label TEXT, "
+        "confidence REAL, allowed INTEGER, created_at TEXT DEFAULT (datetime('now')))"
+    )
+    conn.execute(
+        "INSERT INTO predictions (text, label, confidence, allowed) "
+        "VALUES ('x', 'toxic', 0.9, 0)"
+    )
+    conn.commit()
+    conn.close()
+
+    db = PredictionDB(path, write_behind=False)
+    assert db.storage.query("PRAGMA journal_mode")[0][0] == "wal"
+    db.save("y", "product", 0.9, True)
+    stats = db.get_stats()
+    assert stats["total"] == 2
+    assert stats["by_label"] == {"toxic": 1, "product": 1}
+    assert stats["blocked"] == 1
+
+
+def test_timeseries_rollups(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    db._write(
+        {
+            "prediction": [
+                ("a", "product", 0.9, 1, "2026-01-01 10:15:30", None),
+                ("b", "toxic", 0.9, 0, "2026-01-01 10:15:59", None),
+                ("c", "toxic", 0.9, 0, "2026-01-01 11:00:00", None),
+            ]
+        }
+    )
+    start, end = datetime(2026, 1, 1), datetime(2026, 1, 2)
+    hourly = db.get_timeseries(start, end, "hour")
+    assert [p["bucket"] for p in hourly] == ["2026-01-01 10:00:00", "2026-01-01 11:00:00"]
+    assert hourly[0] == {
+        "bucket": "2026-01-01 10:00:00",
+        "total": 2,
+        "allowed": 1,
+        "blocked": 1,
+        "by_label": {"product": 1, "toxic": 1},
+    }
+    assert db.get_timeseries(start, end, "day")[0]["total"] == 3
+    assert len(db.get_timeseries(start, end, "minute")) == 2
+    assert db.get_timeseries(datetime(2026, 1, 1, 10, 30), end, "minute")[0]["total"] == 1
+
+
+def test_keyset_pagination(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    db.save_many([(f"t{i}", "toxic" if i % 2 else "product", i / 10, not i % 2) for i in range(10)])
+    page = db.get_recent(3)
+    assert [r["text"] for r in page] == ["t9", "t8", "t7"]
+    page = db.get_recent(3, before_id=page[-1]["id"])
+    assert [r["text"] for r in page] == ["t6", "t5", "t4"]
+    assert [r["text"] for r in db.get_recent(10, label="toxic", min_confidence=0.5)] == [
+        "t9",
+        "t7",
+        "t5",
+    ]
+    assert len(db.get_recent(10, allowed=True)) == 5
+
+
+def test_iter_recent_streams_all_rows(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    db.save_many([(f"t{i}", "product", 0.9, True) for i in range(25)])
+    rows = list(db.iter_recent(chunk_size=10))
+    assert len(rows) == 25
+    assert len({r["id"] for r in rows}) == 25
+
+
+def test_concurrent_writers_and_readers(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+
+    def work(n):
+        for i in range(20):
+            db.save(f"{n}-{i}", "product", 0.9, True)
+            db.get_stats()
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert db.get_stats()["total"] == 80
+    db.close()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_storage("mysql")
+
+
+def test_writer_nonblocking_put():
+    release = threading.Event()
+    writer = WriteBehindWriter(
+        lambda rows: release.wait(), flush_interval=0.01, max_queue=1, put_timeout=5
+    )
+    writer.put("prediction", (1,))
+    while writer._queue.qsize():
+        time.sleep(0.001)
+    writer.put("prediction", (2,))
+    started = time.perf_counter()
+    assert writer.put("prediction", (3,), block=False) is False
+    assert time.perf_counter() - started < 1
+    release.set()
+    writer.close()
+
+
+def test_iter_feedback_after_id_ascending(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    for i in range(7):
+        db.save_feedback(f"t{i}", "product", "toxic")
+    rows = list(db.iter_feedback(chunk_size=2, after_id=2))
+    assert [r["id"] for r in rows] == [3, 4, 5, 6, 7]
+    assert [r["id"] for r in db.get_feedback(2, after_id=5)] == [6, 7]
+
+
+def test_sqlite_connections_bounded_across_threads(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    for i in range(50):
+        thread = threading.Thread(target=db.save, args=(f"t{i}", "product", 0.9, True))
+        thread.start()
+        thread.join()
+    assert db.get_stats()["total"] == 50
+    assert len(db.storage._connections) == 1
+    db.close()
+
+
+def test_writer_flush_bounded_under_sustained_writes():
+    sink_threads = set()
+
+    def sink(rows):
+        sink_threads.add(threading.current_thread().name)
+        time.sleep(0.001)
+
+    writer = WriteBehindWriter(
+        sink, flush_interval=0.01, flush_rows=10, max_queue=200, put_timeout=0
+    )
+    stop = threading.Event()
+
+    def produce():
+        while not stop.is_set():
+            writer.put("prediction", (1,))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    try:
+        time.sleep(0.05)
+        started = time.perf_counter()
+        writer.flush()
+        assert time.perf_counter() - started < 5
+        assert sink_threads == {"db-writer"}
+    finally:
+        stop.set()
+        producer.join()
+        writer.close()
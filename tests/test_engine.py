@@ -0,0 +1,81 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from src.classifier import TextClassifier
+from src.engine import export_compact, load_artifact, load_compact, save_artifact
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "classifier.pkl")
+
+TEXTS = [
+    "Samsung Galaxy S24 Ultra 256GB",
+    "fuck you idiot",
+    "Vibratör Klitoral Stimülatör",
+    "İSTANBUL   kargo\tbedava",
+    "a",
+    "",
+]
+
+
+@pytest.fixture
+def compact(tmp_path):
+    pipeline = joblib.load(MODEL_PATH)
+    path = tmp_path / "classifier.compact"
+    export_compact(pipeline, path, version="test")
+    return pipeline, path
+
+
+def test_artifact_roundtrip(tmp_path):
+    path = tmp_path / "a.compact"
+    save_artifact(path, {"k": 1}, {"x": np.arange(5, dtype=np.float32), "e": np.empty(0)})
+    meta, arrays = load_artifact(path)
+    assert meta == {"k": 1}
+    assert arrays["x"].tolist() == [0, 1, 2, 3, 4]
+    assert arrays["e"].shape == (0,)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "bad.compact"
+    path.write_bytes(b"not a model")
+    with pytest.raises(ValueError):
+        load_artifact(path)
+
+
+def test_export_rejects_loss_without_proba(tmp_path):
+    pipeline = joblib.load(MODEL_PATH)
+    pipeline.steps[-1][1].set_params(loss="hinge")
+    path = tmp_path / "hinge.compact"
+    with pytest.raises(ValueError, match="hinge"):
+        export_compact(pipeline, path)
+    assert not path.exists()
+
+
+def test_matches_sklearn_pipeline(compact):
+    pipeline, path = compact
+    meta, vectorizer, estimator = load_compact(path)
+    assert meta["version"] == "test"
+
+    expected = pipeline.named_steps["tfidf"].transform(TEXTS)
+    X = vectorizer.transform(TEXTS)
+    assert abs(X - expected).max() < 1e-5
+    assert np.allclose(estimator.predict_proba(X), pipeline.predict_proba(TEXTS), atol=1e-5)
+    assert estimator.predict(X).tolist() == pipeline.predict(TEXTS).tolist()
+
+
+def test_feature_names_match(compact):
+    pipeline, path = compact
+    _, vectorizer, _ = load_compact(path)
+    expected = pipeline.named_steps["tfidf"].get_feature_names_out()
+    assert vectorizer.get_feature_names_out().tolist() == expected.tolist()
+
+
+def test_classifier_serves_compact(compact, tmp_path):
+    pipeline, path = compact
+    clf = TextClassifier(tmp_path / "classifier.pkl")
+    assert clf._model is None
+    assert clf.version == "test"
+    label, confidence = clf.predict("Samsung Galaxy S24")
+    assert label == pipeline.predict(["Samsung Galaxy S24"])[0]
+    assert "top_features" in clf.explain("Samsung Galaxy S24")
@@ -0,0 +1,39 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from scripts.features import cache_key, vectorize_cached
+from scripts.train import build_classifier, search_classifier
+
+TEXTS = ["Samsung Galaxy S24", "go to hell moron", "Nike Air Max 90", "shut up idiot"] * 5
+LABELS = ["product", "toxic", "product", "toxic"] * 5
+
+
+def _vectorizer(**params):
+    return TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), **params)
+
+
+def test_cache_hit_skips_fit(tmp_path, monkeypatch):
+    vectorizer, X = vectorize_cached(TEXTS, _vectorizer(), str(tmp_path))
+    expected = _vectorizer().fit_transform(TEXTS)
+    assert (X != expected).nnz == 0
+    assert not X.data.flags.writeable  # mapped from the cache, not an in-memory copy
+
+    monkeypatch.setattr(TfidfVectorizer, "fit_transform", lambda *a, **k: 1 / 0)
+    cached_vectorizer, cached = vectorize_cached(TEXTS, _vectorizer(), str(tmp_path))
+    assert (cached != X).nnz == 0
+    assert cached_vectorizer.vocabulary_ == vectorizer.vocabulary_
+
+
+def test_cache_key_tracks_data_and_params():
+    params = _vectorizer().get_params()
+    assert cache_key(TEXTS, params) == cache_key(list(TEXTS), dict(params))
+    assert cache_key(TEXTS[:-1], params) != cache_key(TEXTS, params)
+    assert cache_key(TEXTS, _vectorizer(max_features=10).get_params()) != cache_key(TEXTS, params)
+
+
+def test_search_on_cached_matrix(tmp_path):
+    _, X = vectorize_cached(TEXTS, _vectorizer(), str(tmp_path))
+    classifier, summary = search_classifier(X, LABELS, "random", n_iter=3, cv=2, n_jobs=2)
+    assert summary["candidates"] == 3
+    assert set(summary["best_params"]) == {"loss", "alpha", "penalty", "class_weight"}
+    assert list(classifier.predict(X[:2])) == ["product", "toxic"]
+    assert build_classifier(alpha=1e-3).get_params()["loss"] == "modified_huber"
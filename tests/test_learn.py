@@ -0,0 +1,97 @@
+import json
+
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+
+import scripts.learn as learn_module
+from scripts.learn import learn
+from scripts.train import build_classifier
+from src.classifier import metadata_path
+from src.database import PredictionDB
+
+TEXTS = [
+    "Samsung Galaxy S24",
+    "Nike Air Max",
+    "dildo silicone",
+    "bondage kit",
+    "fuck you idiot",
+    "go to hell moron",
+]
+LABELS = ["product", "product", "adult", "adult", "toxic", "toxic"]
+
+
+def _setup(tmp_path):
+    pipeline = Pipeline(
+        [
+            ("tfidf", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4))),
+            ("clf", build_classifier(max_iter=200)),
+        ]
+    ).fit(TEXTS, LABELS)
+    model_path = tmp_path / "classifier.pkl"
+    joblib.dump(pipeline, model_path)
+    test_path = tmp_path / "test.txt"
+    test_path.write_text(
+        "".join(f"__label__{y} {x}\n" for x, y in zip(TEXTS, LABELS)), encoding="utf-8"
+    )
+    return str(model_path), str(test_path), PredictionDB(tmp_path / "p.db", write_behind=False)
+
+
+def test_learn_applies_feedback_and_publishes(tmp_path, monkeypatch):
+    model_path, test_path, db = _setup(tmp_path)
+    with open(metadata_path(model_path), "w", encoding="utf-8") as f:
+        json.dump({"version": "base", "feedback_watermark": 1}, f)
+    db.save_feedback("already applied", "product", "toxic")
+    db.save_feedback("Apple MacBook Pro", "adult", "product")
+    db.save_feedback("kill yourself", "product", "toxic")
+    db.save_feedback("weird", "product", "spam")
+
+    published = []
+    monkeypatch.setattr(
+        learn_module,
+        "publish",
+        lambda pipeline, meta: published.append((pipeline, meta)) or "new.pkl",
+    )
+    result = learn(db, model_path, test_path, max_drop=1.0)
+
+    assert result["after_id"] == 1
+    assert result["watermark"] == 4
+    assert (result["applied"], result["skipped"]) == (2, 1)
+    assert result["published"] == "new.pkl"
+    pipeline, meta = published[0]
+    assert meta["feedback_watermark"] == 4 and meta["base_version"] == "base"
+    assert pipeline[-1].class_weight == "balanced"
+    # The model on disk is untouched until publish installs the new one
+    assert joblib.load(model_path)[-1].class_weight == "balanced"
+
+
+def test_learn_gate_rejects(tmp_path, monkeypatch):
+    model_path, test_path, db = _setup(tmp_path)
+    for _ in range(20):
+        db.save_feedback("Samsung Galaxy S24", "product", "toxic")
+    monkeypatch.setattr(learn_module, "publish", lambda *a: 1 / 0)
+    result = learn(db, model_path, test_path, max_drop=0.0, epochs=5)
+    assert result["rejected"] is True
+    assert result["published"] is None
+    assert result["macro_f1_after"] < result["macro_f1_before"]
+
+
+def test_learn_without_new_feedback(tmp_path):
+    model_path, test_path, db = _setup(tmp_path)
+    result = learn(db, model_path, test_path)
+    assert result["applied"] == 0 and result["published"] is None
+
+
+def test_learn_advances_watermark_past_skipped_rows(tmp_path, monkeypatch):
+    model_path, test_path, db = _setup(tmp_path)
+    with open(metadata_path(model_path), "w", encoding="utf-8") as f:
+        json.dump({"version": "base", "feedback_watermark": 0}, f)
+    db.save_feedback("weird", "product", "spam")
+    db.save_feedback("odd", "toxic", "spam")
+    monkeypatch.setattr(learn_module, "publish", lambda *a: 1 / 0)
+
+    result = learn(db, model_path, test_path)
+    assert (result["applied"], result["skipped"], result["watermark"]) == (0, 2, 2)
+    with open(metadata_path(model_path), encoding="utf-8") as f:
+        assert json.load(f) == {"version": "base", "feedback_watermark": 2}
+    assert learn(db, model_path, test_path)["skipped"] == 0
@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import pytest
+
+from src.cache import PredictionCache
+from src.classifier import TextClassifier
+from src.registry import ModelRegistry, ModelWatcher
+
+
+def _install_latest(model_dir, version):
+    # Same order as train.publish: metadata first, pickle last
+    shutil.copy2(model_dir / f"classifier_{version}.json", model_dir / "classifier.json")
+    shutil.copy2(model_dir / f"classifier_{version}.pkl", model_dir / "classifier.tmp")
+    os.replace(model_dir / "classifier.tmp", model_dir / "classifier.pkl")
+
+
+def test_list_versions(tmp_path, add_model_version):
+    add_model_version("20260101_000000", metrics={"accuracy": 0.9})
+    add_model_version("20260102_000000", metrics={"accuracy": 0.95})
+    (tmp_path / "notes.txt").write_text("x")
+    versions = ModelRegistry(tmp_path).list_versions()
+    assert [v["version"] for v in versions] == ["20260102_000000", "20260101_000000"]
+    assert versions[0]["metrics"] == {"accuracy": 0.95}
+
+
+def test_unknown_version(tmp_path):
+    with pytest.raises(KeyError):
+        ModelRegistry(tmp_path).path("20990101_000000")
+    with pytest.raises(KeyError):
+        ModelRegistry(tmp_path).path("../classifier")
+
+
+def test_load_reports_version(tmp_path, add_model_version):
+    path = add_model_version("20260101_000000")
+    clf = TextClassifier(path)
+    assert clf.version == "20260101_000000"
+    assert clf.get_detail("Samsung Galaxy")["model_version"] == "20260101_000000"
+
+
+def test_watcher_hot_swaps(tmp_path, add_model_version):
+    add_model_version("20260101_000000")
+    add_model_version("20260102_000000")
+    _install_latest(tmp_path, "20260101_000000")
+
+    cache = PredictionCache(max_size=10)
+    clf = TextClassifier(tmp_path / "classifier.pkl", cache=cache)
+    watcher = ModelWatcher(clf, interval=60)
+    clf.predict("Samsung Galaxy")
+    assert watcher.check() is False
+
+    _install_latest(tmp_path, "20260102_000000")
+    assert watcher.check() is True
+    assert clf.version == "20260102_000000"
+    assert len(cache) == 0
+
+
+def test_failed_reload_keeps_model(tmp_path, add_model_version):
+    add_model_version("20260101_000000")
+    _install_latest(tmp_path, "20260101_000000")
+    clf = TextClassifier(tmp_path / "classifier.pkl")
+    watcher = ModelWatcher(clf, interval=60)
+
+    (tmp_path / "corrupt.pkl").write_bytes(b"corrupt")
+    os.replace(tmp_path / "corrupt.pkl", tmp_path / "classifier.pkl")
+    assert watcher.check() is False
+    assert clf.version == "20260101_000000"
+    assert clf.predict("Samsung Galaxy")[0] in ("product", "adult", "toxic")
+
+
+def test_failed_reload_is_retried(tmp_path, add_model_version, monkeypatch):
+    add_model_version("20260101_000000")
+    add_model_version("20260102_000000")
+    _install_latest(tmp_path, "20260101_000000")
+    clf = TextClassifier(tmp_path / "classifier.pkl")
+    watcher = ModelWatcher(clf, interval=60)
+
+    def short_read(path):
+        raise OSError("short read")
+
+    _install_latest(tmp_path, "20260102_000000")
+    load = clf.load
+    monkeypatch.setattr(clf, "load", short_read)
+    assert watcher.check() is False
+    assert clf.version == "20260101_000000"
+
+    monkeypatch.setattr(clf, "load", load)
+    assert watcher.check() is True
+    assert clf.version == "20260102_000000"
+    assert watcher.check() is False
+
+
+def test_watcher_waits_for_pickle(tmp_path, add_model_version):
+    add_model_version("20260101_000000")
+    add_model_version("20260102_000000")
+    _install_latest(tmp_path, "20260101_000000")
+    clf = TextClassifier(tmp_path / "classifier.pkl")
+    watcher = ModelWatcher(clf, interval=60)
+
+    # Mid-publish: new metadata installed, old pickle still in place
+    shutil.copy2(tmp_path / "classifier_20260102_000000.json", tmp_path / "classifier.json")
+    assert watcher.check() is False
+    assert clf.version == "20260101_000000"
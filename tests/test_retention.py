@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+from src.database import PredictionDB
+from src.retention import archive_expired, archive_path, read_archive
+
+
+def _seed(db):
+    db._write(
+        {
+            "prediction": [
+                ("old a", "product", 0.9, 1, "2026-01-01 10:00:00", None),
+                ("old b", "toxic", 0.9, 0, "2026-01-02 11:00:00", None),
+                ("new", "adult", 0.9, 0, "2026-03-01 12:00:00", None),
+            ]
+        }
+    )
+
+
+def test_archive_expired(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    _seed(db)
+    now = datetime(2026, 3, 2, tzinfo=timezone.utc)
+
+    archived = archive_expired(db, 30, tmp_path / "archive", chunk_size=1, now=now)
+
+    assert archived == 2
+    assert [r["text"] for r in db.get_recent()] == ["new"]
+    rows = list(read_archive(archive_path(tmp_path / "archive", "2026-01-01")))
+    assert [r["text"] for r in rows] == ["old a"]
+    rows = list(read_archive(archive_path(tmp_path / "archive", "2026-01-02")))
+    assert [r["label"] for r in rows] == ["toxic"]
+    assert db.get_stats()["total"] == 3
+
+
+def test_archive_chunk_spares_rows_between_its_ids(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    db._write(
+        {
+            "prediction": [
+                ("old a", "product", 0.9, 1, "2026-01-01 10:00:00", None),
+                ("new", "adult", 0.9, 0, "2026-03-01 12:00:00", None),
+                ("old b", "toxic", 0.9, 0, "2026-01-02 11:00:00", None),
+                ("old c", "toxic", 0.9, 0, "2026-01-01 09:00:00", None),
+            ]
+        }
+    )
+    now = datetime(2026, 3, 2, tzinfo=timezone.utc)
+
+    assert archive_expired(db, 30, tmp_path / "archive", chunk_size=2, now=now) == 3
+    assert [r["text"] for r in db.get_recent()] == ["new"]
+    rows = list(read_archive(archive_path(tmp_path / "archive", "2026-01-01")))
+    assert sorted(r["text"] for r in rows) == ["old a", "old c"]
+
+
+def test_archive_appends_to_partition(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    now = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    for text in ("first", "second"):
+        db._write({"prediction": [(text, "product", 0.9, 1, "2026-01-01 10:00:00", None)]})
+        archive_expired(db, 30, tmp_path / "archive", now=now)
+    rows = list(read_archive(archive_path(tmp_path / "archive", "2026-01-01")))
+    assert [r["text"] for r in rows] == ["first", "second"]
+
+
+def test_archive_prunes_fine_rollups(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    _seed(db)
+    archive_expired(db, 30, tmp_path / "archive", now=datetime(2026, 3, 2, tzinfo=timezone.utc))
+
+    start, end = datetime(2026, 1, 1), datetime(2026, 3, 2)
+    assert [p["bucket"] for p in db.get_timeseries(start, end, "minute")] == ["2026-03-01 12:00:00"]
+    assert len(db.get_timeseries(start, end, "hour")) == 1
+    assert sum(p["total"] for p in db.get_timeseries(start, end, "day")) == 3
+
+
+def test_retention_disabled(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    _seed(db)
+    assert archive_expired(db, 0, tmp_path / "archive") == 0
+    assert len(db.get_recent()) == 3
+
+
+def test_new_database_uses_incremental_vacuum(tmp_path):
+    db = PredictionDB(tmp_path / "p.db", write_behind=False)
+    assert db.incremental_vacuum() is True
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from src.cache import PredictionCache
+from src.classifier import TextClassifier
+from src.metrics import RULE_SHORT_CIRCUITS
+from src.rules import RuleEngine, fold, load_rules
+
+
+@pytest.fixture
+def engine():
+    return RuleEngine(
+        block={"toxic": ["siktir*", "piç", "go fuck yourself"], "adult": ["dildo", "ifşa"]},
+        allow=["Samsung Galaxy S24", "Apple Watch"],
+    )
+
+
+def test_turkish_folding():
+    assert fold("İSTANBUL Iğdır  ılık") == "istanbul iğdir ilik"
+    assert fold("İFŞA") == fold("ifşa") == fold("IFŞA")
+
+
+def test_match_whole_words_and_prefixes(engine):
+    assert engine.match("SİKTİR git").name == "block:siktir*"
+    assert engine.match("siktirgit buradan").label == "toxic"
+    assert engine.match("bu kızın İFŞA fotoğrafları").label == "adult"
+    assert engine.match("piçler") is None
+    assert engine.match("pineapple juice") is None
+    assert engine.match("Nike Air Max") is None
+
+
+def test_allow_needs_exact_title(engine):
+    assert engine.match("  APPLE   watch ").name == "allow:apple watch"
+    assert engine.match("Apple Watch band") is None
+    assert engine.match("Samsung Galaxy S24, I will find you and kill your family") is None
+
+
+def test_block_beats_allow(engine):
+    rule = engine.match("Samsung Galaxy S24 dildo")
+    assert (rule.action, rule.label, rule.term) == ("block", "adult", "dildo")
+    assert engine.match("samsung   GALAXY s24").action == "allow"
+
+
+def test_overlapping_terms():
+    engine = RuleEngine(block={"toxic": ["he", "she", "hers"]})
+    assert engine.match("ushers") is None
+    assert engine.match("ok hers").term == "hers"
+    assert engine.match("she said").term == "she"
+
+
+def test_load_rules(tmp_path):
+    assert load_rules("") is None
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps({"block": {"toxic": ["moron"]}, "allow": ["nike"]}), encoding="utf-8"
+    )
+    assert load_rules(path).size == 2
+    path.write_text(json.dumps({"block": ["moron"]}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_rules(path)
+
+
+def test_classifier_short_circuits(engine):
+    clf = TextClassifier(cache=PredictionCache(0), rules=engine)
+    calls = []
+    infer = clf._infer
+    clf._infer = lambda model, texts: calls.append(texts) or infer(model, texts)
+    before = RULE_SHORT_CIRCUITS.labels(action="block", label="adult")._value.get()
+
+    details = clf.get_detail_batch(["Dildo silicone", "Samsung Galaxy S24", "Nike Air Max"])
+    assert details[0]["label"] == "adult" and details[0]["allowed"] is False
+    assert details[0]["rule"] == "block:dildo" and details[0]["confidence"] == 1.0
+    assert details[1]["rule"] == "allow:samsung galaxy s24" and details[1]["allowed"] is True
+    assert details[2]["rule"] is None
+    assert calls == [["Nike Air Max"]]
+    assert RULE_SHORT_CIRCUITS.labels(action="block", label="adult")._value.get() == before + 1
+
+
+def test_allow_term_does_not_bypass_model(engine):
+    # A known title inside a longer text is scored by the model like any other text
+    texts = [
+        "Samsung Galaxy S24, I will find you and kill your family",
+        "Apple Watch go to hell moron piece of shit",
+    ]
+    plain = TextClassifier(cache=PredictionCache(0))
+    clf = TextClassifier(cache=PredictionCache(0), rules=engine)
+    for text in texts:
+        detail = clf.get_detail(text)
+        assert detail["rule"] is None
+        assert detail == plain.get_detail(text) | {"rule": None}
+        if detail["label"] != "product":
+            assert detail["allowed"] is False
+
+
+def test_explain_applies_rules(engine):
+    clf = TextClassifier(cache=PredictionCache(0), rules=engine)
+    results = clf.explain_batch(["bu kızın İFŞA fotoğrafları", "Nike Air Max"])
+    assert results[0]["label"] == "adult" and results[0]["rule"] == "block:ifşa"
+    assert results[0]["top_features"] == []
+    assert results[1]["rule"] is None and results[1]["top_features"]
+    assert clf.get_detail("bu kızın İFŞA fotoğrafları")["label"] == results[0]["label"]
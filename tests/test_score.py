@@ -0,0 +1,68 @@
+import json
+
+from scripts.score import _save_checkpoint, detect_format, score_file
+
+
+def _write(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return path
+
+
+def _rows(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_detect_format(tmp_path):
+    assert detect_format(str(_write(tmp_path / "a.txt", ["__label__product Nike"]))) == "fasttext"
+    assert detect_format(str(_write(tmp_path / "b.txt", ["Nike Air Max"]))) == "text"
+    assert detect_format(str(tmp_path / "c.csv")) == "csv"
+    assert detect_format(str(tmp_path / "d.jsonl")) == "ndjson"
+
+
+def test_score_fasttext_in_order(tmp_path):
+    texts = [f"__label__product Samsung Galaxy S{i}" for i in range(25)] + ["", "__label__toxic"]
+    src = _write(tmp_path / "in.txt", texts)
+    out = tmp_path / "out.ndjson"
+
+    assert score_file(str(src), str(out), chunk_size=4, workers=2) == 25
+    rows = _rows(out)
+    assert [r["line"] for r in rows] == list(range(1, 26))
+    assert all(r["expected"] == "product" and "label" in r for r in rows)
+    assert not (tmp_path / "out.ndjson.ckpt").exists()
+
+
+def test_score_csv_and_ndjson(tmp_path):
+    src = _write(tmp_path / "in.csv", ["id,text", '1,"Nike Air\nMax"', "2,go to hell moron"])
+    out = tmp_path / "csv.ndjson"
+    score_file(str(src), str(out), workers=1)
+    assert [(r["id"], r["line"]) for r in _rows(out)] == [("1", 2), ("2", 4)]
+
+    src = _write(tmp_path / "in.ndjson", [json.dumps({"id": 7, "text": "Nike"}), "{bad", '"Sony"'])
+    out = tmp_path / "json.ndjson"
+    score_file(str(src), str(out), workers=1)
+    assert [r.get("id") for r in _rows(out)] == [7, None]
+
+
+def test_resume_from_checkpoint(tmp_path):
+    lines = [f"Nike Air Max {i}" for i in range(10)]
+    src = _write(tmp_path / "in.txt", lines)
+    out = tmp_path / "out.ndjson"
+    score_file(str(src), str(out), chunk_size=3, workers=1)
+    expected = out.read_bytes()
+
+    # Simulate a job killed after the first chunk, with part of the next chunk written
+    first = b"".join(expected.splitlines(keepends=True)[:3])
+    out.write_bytes(first + b'{"line": 4, "lab')
+    _save_checkpoint(
+        str(tmp_path / "out.ndjson.ckpt"),
+        {
+            "input": str(src.resolve()),
+            "lines": 3,
+            "input_offset": len("".join(line + "\n" for line in lines[:3]).encode()),
+            "output_offset": len(first),
+            "header": None,
+        },
+    )
+
+    assert score_file(str(src), str(out), chunk_size=3, workers=1) == 7
+    assert out.read_bytes() == expected
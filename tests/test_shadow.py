@@ -0,0 +1,70 @@
+import threading
+
+from src.classifier import TextClassifier
+from src.database import PredictionDB
+from src.shadow import ShadowRouter
+
+TEXTS = ["Samsung Galaxy S24", "vibrator massager", "go to hell moron", "Nike Air Max"]
+
+
+CANDIDATE = "20260101_000000"
+
+
+def _router(tmp_path, model_path, **kwargs):
+    db = PredictionDB(tmp_path / "test.db", write_behind=False)
+    return ShadowRouter(TextClassifier(model_path), db, **kwargs), db
+
+
+def test_passthrough_without_candidate(tmp_path, model_path):
+    router, db = _router(tmp_path, model_path, sample_rate=1.0)
+    details = router.get_detail_batch(TEXTS)
+    assert details == router.primary.get_detail_batch(TEXTS)
+    router.drain()
+    assert db.get_shadow_summary() == {}
+
+
+def test_shadow_records_agreement(tmp_path, model_path, add_model_version):
+    router, db = _router(tmp_path, model_path, sample_rate=1.0, canary_percent=0)
+    version = router.set_candidate(add_model_version(CANDIDATE))
+    details = router.get_detail_batch(TEXTS)
+    assert all(d["model_version"] == router.primary.version for d in details)
+
+    router.drain()
+    summary = db.get_shadow_summary(version)[version]
+    assert sum(s["total"] for s in summary.values()) == len(TEXTS)
+    # Same weights, so the candidate agrees on every item
+    assert all(s["agreement_rate"] == 1.0 and s["disagree"] == 0 for s in summary.values())
+
+
+def test_canary_routes_to_candidate(tmp_path, model_path, add_model_version):
+    router, db = _router(tmp_path, model_path, sample_rate=1.0)
+    version = router.set_candidate(add_model_version(CANDIDATE), canary_percent=100)
+    details = router.get_detail_batch(TEXTS)
+    assert [d["model_version"] for d in details] == [version] * len(TEXTS)
+    router.drain()
+    assert db.get_shadow_summary() == {}
+
+
+def test_saturated_executor_skips(tmp_path, model_path, add_model_version):
+    router, db = _router(tmp_path, model_path, sample_rate=1.0, max_pending=0)
+    router.set_candidate(add_model_version(CANDIDATE))
+    router.get_detail_batch(TEXTS)
+    router.drain()
+    assert db.get_shadow_summary() == {}
+
+
+def test_drain_waits_for_pending_comparisons(tmp_path, model_path, add_model_version):
+    router, db = _router(tmp_path, model_path, sample_rate=1.0, canary_percent=0)
+    version = router.set_candidate(add_model_version(CANDIDATE))
+    release, score = threading.Event(), router.candidate.get_detail_batch
+
+    def blocked(texts):
+        release.wait()
+        return score(texts)
+
+    router.candidate.get_detail_batch = blocked
+    router.get_detail_batch(TEXTS)
+    assert router.drain(timeout=0.05) is False
+    release.set()
+    assert router.drain(timeout=5) is True
+    assert sum(s["total"] for s in db.get_shadow_summary(version)[version].values()) == len(TEXTS)
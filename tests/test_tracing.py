@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+
+from src.executor import run_inference
+from src.metrics import STAGE_LATENCY
+from src.profiler import sample_profile
+from src.tracing import endpoint, span, traced
+
+
+def _count(endpoint_name, stage):
+    return STAGE_LATENCY.labels(endpoint=endpoint_name, stage=stage)._sum.get()
+
+
+def test_spans_labelled_by_endpoint():
+    before = _count("unit", "work")
+    with traced("unit", sample_rate=0):
+        with span("work"):
+            time.sleep(0.01)
+    assert _count("unit", "work") - before >= 0.01
+    assert _count("unit", "total") >= 0.01
+
+
+def test_sampled_trace_logged(caplog):
+    with traced("sampled", sample_rate=1.0):
+        with span("a"):
+            pass
+        with endpoint("nested"):
+            with span("b"):
+                pass
+    messages = [r.getMessage() for r in caplog.records if r.name == "trace"]
+    assert messages and '"endpoint": "sampled"' in messages[-1]
+    assert '"stage": "a"' in messages[-1] and '"stage": "b"' in messages[-1]
+
+
+def test_context_follows_into_inference_executor():
+    def work():
+        with span("in_thread"):
+            return threading.current_thread().name
+
+    async def run():
+        with traced("executor", sample_rate=0):
+            return await run_inference(work)
+
+    before = _count("executor", "in_thread")
+    assert asyncio.run(run()).startswith("inference")
+    assert _count("executor", "in_thread") > before
+
+
+def test_sample_profile_sees_busy_thread():
+    # Once started, the worker's only Python frame is busy_loop (no threading.py calls in
+    # the loop), so every sample sees it however few the CPU allows
+    started, done = threading.Event(), []
+
+    def busy_loop():
+        started.set()
+        while not done:
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_loop)
+    worker.start()
+    started.wait()
+    try:
+        result = sample_profile(0.05, 0.005)
+    finally:
+        done.append(True)
+        worker.join()
+    assert result["samples"] >= 1
+    assert any(f["function"].startswith("busy_loop ") for f in result["top"])
+    assert "busy_loop" in result["collapsed"]